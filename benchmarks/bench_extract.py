@@ -0,0 +1,132 @@
+"""
+    extraction backend benchmark
+
+    Compares `PageExtract` (regex scan) with `LxmlPageExtract` (lxml tree)
+    for throughput and recall of iframe and playlist URLs.
+
+    The corpus is a directory of saved pages (*.html, *.htm),
+    without a directory synthetic pages are used. The recall of saved pages
+    is the share of the URLs found by any backend, the recall of
+    synthetic pages is the share of the URLs they were built with.
+
+    python benchmarks/bench_extract.py [DIRECTORY] [RUNS]
+"""
+import glob
+import os.path
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from plugins.generic import HAS_LXML, LxmlPageExtract, PageExtract  # noqa
+
+DEFAULT_RUNS = 5
+SYNTHETIC_PAGES = 50
+
+BACKENDS = [('regex', PageExtract)]
+if HAS_LXML:
+    BACKENDS.append(('lxml', LxmlPageExtract))
+
+IFRAMES = (
+    '<iframe src="{0}" width="640" height="360"></iframe>',
+    '<iframe width="640"\n        src="{0}"\n        allowfullscreen></iframe>',
+    '<IFRAME SRC=\'{0}\'></IFRAME>',
+    '<iframe src = "{0}"></iframe>',
+    '<iframe src={0}></iframe>',
+    '<script>document.write(\'<iframe src="{0}"></iframe>\');</script>',
+    '<script><iframe src="{0}"></iframe></script>',
+)
+PLAYLISTS = (
+    '<video src="{0}"></video>',
+    '<video controls>\n<source type="application/x-mpegURL" src="{0}">\n</video>',
+    '<script>var player = {{file: "{0}"}};</script>',
+    '<script>\nplayer.load({{\n  source: \'{0}\',\n}});\n</script>',
+    '<div class="player" data-src="{0}"></div>',
+    '<a href="{0}">Download</a>',
+    '<div data-config=\'{{"file": "{0}"}}\'></div>',
+)
+FILLER = (
+    '<div class="item"><a href="/page/{0}">Article {0}</a><p>{1}</p></div>',
+    '<script>var data = {{"id": {0}, "text": "{1}"}};</script>',
+    '<img src="/images/{0}.jpg" alt="{1}">',
+)
+
+
+def synthetic_page(rand, index):
+    '''page and its (iframe, playlist) URLs'''
+    parts = []
+    iframes, playlists = set(), set()
+    for i in range(200):
+        kind = rand.random()
+        if kind < 0.02:
+            url = 'https://example.com/embed/{0}/{1}'.format(index, i)
+            iframes.add(url)
+            parts.append(rand.choice(IFRAMES).format(url))
+        elif kind < 0.04:
+            url = 'https://example.com/live/{0}/{1}.m3u8'.format(index, i)
+            playlists.add(url)
+            parts.append(rand.choice(PLAYLISTS).format(url))
+        else:
+            parts.append(rand.choice(FILLER).format(i, 'lorem ipsum dolor sit amet ' * rand.randint(1, 10)))
+    html = '<!DOCTYPE html>\n<html><head><title>Page {0}</title></head><body>\n{1}\n</body></html>'.format(
+        index, '\n'.join(parts))
+    return html, (iframes, playlists)
+
+
+def load_corpus(directory):
+    pages = []
+    for filename in sorted(glob.glob(os.path.join(directory, '*.htm*'))):
+        with open(filename, encoding='utf-8', errors='replace') as f:
+            pages.append((f.read(), None))
+    return pages
+
+
+def found(backend, html):
+    try:
+        extract = backend(html)
+    except ValueError:
+        extract = PageExtract(html)
+    return set(extract.urls('iframe')), set(extract.urls('playlist'))
+
+
+def bench(backend, pages, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for html, truth in pages:
+            found(backend, html)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def recall(backend, pages):
+    hits = total = 0
+    for html, truth in pages:
+        if truth is None:
+            # saved page, every URL that any backend found
+            truth = tuple(set.union(*urls) for urls in zip(*(found(b, html) for name, b in BACKENDS)))
+        result = found(backend, html)
+        for expected, urls in zip(truth, result):
+            hits += len(expected & urls)
+            total += len(expected)
+    return hits / total if total else 1.0
+
+
+def main(directory, runs):
+    if directory:
+        pages = load_corpus(directory)
+    else:
+        rand = random.Random(0)
+        pages = [synthetic_page(rand, index) for index in range(SYNTHETIC_PAGES)]
+    size = sum(len(html) for html, truth in pages) / 1024 / 1024
+    print('{0} pages, {1:.1f} MB'.format(len(pages), size))
+    print('{0:>8} {1:>10} {2:>8}'.format('backend', 'MB/s', 'recall'))
+    for name, backend in BACKENDS:
+        seconds = bench(backend, pages, runs)
+        print('{0:>8} {1:>10.1f} {2:>8.3f}'.format(name, size / seconds, recall(backend, pages)))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    directory = args.pop(0) if args and not args[0].isdigit() else None
+    main(directory, int(args[0]) if args else DEFAULT_RUNS)
@@ -0,0 +1,52 @@
+"""
+    plugin import benchmark
+
+    Import time of `plugins/generic.py` in a new interpreter,
+    like streamlink loads the plugin on every start.
+
+    - without youtube-dl: yt-dlp and youtube-dl are hidden
+    - lazy: yt-dlp is installed, but only imported by `ytdl_fallback`
+    - eager: yt-dlp is imported together with the plugin,
+      the import time before `import_youtube_dl`
+
+    python benchmarks/bench_import.py [RUNS]
+"""
+import os.path
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_RUNS = 10
+
+HIDE_YTDL = "import sys; sys.modules['yt_dlp'] = sys.modules['youtube_dl'] = None\n"
+IMPORT = """
+import time
+start = time.perf_counter()
+import plugins.generic
+{0}
+print(time.perf_counter() - start)
+"""
+MODES = (
+    ('without youtube-dl', HIDE_YTDL + IMPORT.format('')),
+    ('lazy', IMPORT.format('')),
+    ('eager', IMPORT.format('plugins.generic.import_youtube_dl()')),
+)
+
+
+def bench(code, runs):
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+        times.append(float(output))
+    return statistics.median(times)
+
+
+def main(runs):
+    print('{0:>20} {1:>12}'.format('mode', 'median (ms)'))
+    for title, code in MODES:
+        print('{0:>20} {1:>12.1f}'.format(title, bench(code, runs) * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if sys.argv[1:] else DEFAULT_RUNS)
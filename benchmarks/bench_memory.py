@@ -0,0 +1,57 @@
+"""
+    website memory benchmark
+
+    tracemalloc peak of reading a large website with `res.text`
+    and with --generic-max-document-size, which decodes chunk by chunk,
+    for a limit above the website size and a limit of 1 MB.
+    The website is served by requests_mock.
+
+    python benchmarks/bench_memory.py [MB ...]
+"""
+import os.path
+import sys
+import tracemalloc
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from plugins.generic import Generic  # noqa
+
+DEFAULT_SIZES = (10, 50)
+URL = 'http://mocked/memory'
+
+
+def website(size):
+    line = '<div><a href="/page">Article</a><p>lorem ipsum dolor sit amet</p></div>\n'
+    return (line * (size * 1024 * 1024 // len(line))).encode('utf-8')
+
+
+def peak(body, max_size=None):
+    options = Options({'max-document-size': max_size} if max_size else {})
+    plugin = Generic(Streamlink(), URL, options)
+    with requests_mock.Mocker() as mock:
+        mock.get(URL, content=body, headers={'Content-Type': 'text/html; charset=utf-8'})
+        tracemalloc.start()
+        try:
+            text = plugin._res_text(URL)
+            return tracemalloc.get_traced_memory()[1], len(text)
+        finally:
+            tracemalloc.stop()
+
+
+def main(sizes):
+    print('{0:>6} {1:>22} {2:>10} {3:>10}'.format('MB', 'mode', 'peak MB', 'chars'))
+    for size in sizes:
+        body = website(size)
+        for title, max_size in (('res.text', None),
+                                ('chunked, no limit', len(body) + 1),
+                                ('chunked, 1 MB limit', 1024 * 1024)):
+            memory, chars = peak(body, max_size)
+            print('{0:>6} {1:>22} {2:>10.1f} {3:>10}'.format(size, title, memory / 1024 / 1024, chars))
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,135 @@
+"""
+    P.A.C.K.E.R. unpack benchmark
+
+    Compares `Packer.unpack` with the previous implementation
+    (one `LegacyUnbaser` call per token, one `str.replace` per string table entry)
+    on synthetic payloads of increasing size.
+
+    python benchmarks/bench_packer.py [SIZE ...]
+"""
+import os.path
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from plugins.generic import Packer  # noqa
+
+DEFAULT_SIZES = (1000, 5000, 10000, 25000)
+
+
+class LegacyUnbaser(object):
+    """Unbaser before the memoised word map, a dictionary lookup
+    and a power for every char of every token"""
+    ALPHABET = {
+        62: '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ',
+        95: (' !"#$%&\'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+             '[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~')
+    }
+
+    def __init__(self, base):
+        self.base = base
+        # fill elements 37...61, if necessary
+        if 36 < base < 62:
+            if not hasattr(self.ALPHABET,
+                           self.ALPHABET[62][:base]):
+                self.ALPHABET[base] = self.ALPHABET[62][:base]
+        # If base can be handled by int() builtin, let it do it for us
+        if 2 <= base <= 36:
+            self.unbase = lambda s: int(s, base)
+        else:
+            # Build conversion dictionary cache
+            try:
+                self.dictionary = dict(
+                    (cipher, index) for index, cipher in enumerate(self.ALPHABET[base]))
+            except KeyError:
+                raise TypeError('Unsupported base encoding.')
+            self.unbase = self._dictunbaser
+
+    def __call__(self, s):
+        return self.unbase(s)
+
+    def _dictunbaser(self, s):
+        """Decodes a  value to an integer."""
+        ret = 0
+        for index, cipher in enumerate(s[::-1]):
+            ret += (self.base ** index) * self.dictionary[cipher]
+        return ret
+
+
+class LegacyPacker(Packer):
+    """Packer.unpack and Packer._replacestrings before the word map"""
+
+    def unpack(self, source):
+        payload, symtab, radix, count = self._filterargs(source)
+        unbase = int if radix == 1 else LegacyUnbaser(radix)
+
+        def lookup(match):
+            word = match.group(0)
+            return symtab[unbase(word)] or word
+
+        source = re.sub(r'\b\w+\b', lookup, payload)
+        return self._replacestrings(source)
+
+    def _replacestrings(self, source):
+        match = re.search(r'var *(_\w+)\=\["(.*?)"\];', source, re.DOTALL)
+        if match:
+            varname, strings = match.groups()
+            startpoint = len(match.group(0))
+            lookup = strings.split('","')
+            variable = '%s[%%d]' % varname
+            for index, value in enumerate(lookup):
+                source = source.replace(variable % index, '"%s"' % value)
+            return source[startpoint:]
+        return self.beginstr + source + self.endstr
+
+
+def encode(number, radix=62):
+    alphabet = LegacyUnbaser.ALPHABET[62]
+    word = ''
+    while True:
+        number, digit = divmod(number, radix)
+        word = alphabet[digit] + word
+        if not number:
+            return word
+
+
+def packed_source(size):
+    """p.a.c.k.e.r. source with `size` symbols"""
+    payload = ';'.join('{0}.{1}({2})'.format(encode(i), encode(size - i - 1), encode(i // 2))
+                       for i in range(size))
+    symtab = '|'.join('sym{0}'.format(i) for i in range(size))
+    return "eval(function(p,a,c,k,e,d){{}}('{0}',62,{1},'{2}'.split('|'),0,{{}}))".format(
+        payload, size, symtab)
+
+
+def string_table_source(size):
+    """unpacked source with a `size` entries string lookup table"""
+    return 'var _s=[{0}];{1}'.format(
+        ','.join('"str{0}"'.format(i) for i in range(size)),
+        ';'.join('f(_s[{0}])'.format(i) for i in range(size)),
+    )
+
+
+def bench(func, source):
+    start = time.perf_counter()
+    result = func(source)
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    for title, source_func, method in (('unpack', packed_source, 'unpack'),
+                                       ('_replacestrings', string_table_source, '_replacestrings')):
+        print(title)
+        print('{0:>8} {1:>12} {2:>12} {3:>8}'.format('size', 'legacy (s)', 'packer (s)', 'speedup'))
+        for size in sizes:
+            source = source_func(size)
+            legacy_time, legacy_result = bench(getattr(LegacyPacker(), method), source)
+            packer_time, packer_result = bench(getattr(Packer(), method), source)
+            assert legacy_result == packer_result
+            print('{0:>8} {1:>12.4f} {2:>12.4f} {3:>7.1f}x'.format(
+                size, legacy_time, packer_time, legacy_time / packer_time))
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
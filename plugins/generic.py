@@ -6,17 +6,29 @@
 """
 import base64
 import codecs
+import contextvars
+import functools
+import importlib
+import importlib.util
+import json
 import logging
+import threading
 import time
+import weakref
 import os
 import os.path
 import re
 
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from contextlib import contextmanager
 from html import unescape as html_unescape
 from pathlib import Path
-from typing import Pattern
+from typing import Any, Callable, Dict, List, Match, Optional, Pattern, Tuple, Union
 from urllib.parse import parse_qsl, unquote, urljoin, urlparse
 
+import requests.adapters
+
+from streamlink.cache import CACHE_DIR
 from streamlink.exceptions import (
     FatalPluginError,
     NoPluginError,
@@ -27,23 +39,209 @@ from streamlink.plugin.api import useragents
 from streamlink.plugin.plugin import HIGH_PRIORITY
 from streamlink.stream import HLSStream, HTTPStream, DASHStream
 from streamlink.stream.ffmpegmux import MuxedStream
-from streamlink.utils.args import comma_list, num
+from streamlink.utils.args import comma_list, filesize, num
 from streamlink.utils.url import update_scheme
 
-try:
-    import yt_dlp as youtube_dl
-    HAS_YTDL = True
-except ImportError:
-    try:
-        import youtube_dl
-        HAS_YTDL = True
-    except ImportError:
-        HAS_YTDL = False
+# yt-dlp or youtube-dl, imported by import_youtube_dl
+YTDL_MODULES = ('yt_dlp', 'youtube_dl')
+HAS_YTDL = any(importlib.util.find_spec(name) is not None for name in YTDL_MODULES)
+youtube_dl = None
 
 GENERIC_VERSION = "2023-08-24"
 
 log = logging.getLogger(__name__)
 
+
+def import_youtube_dl():
+    '''imports yt-dlp or youtube-dl on the first use,
+       the import takes a long time and is not needed for most URLs'''
+    global youtube_dl
+    if youtube_dl is None:
+        for name in YTDL_MODULES:
+            try:
+                youtube_dl = importlib.import_module(name)
+                break
+            except ImportError:
+                continue
+    return youtube_dl
+
+
+# lxml, imported by import_lxml
+HAS_LXML = importlib.util.find_spec('lxml') is not None
+lxml_html = None
+
+
+def import_lxml():
+    '''imports lxml.html on the first use of --generic-extract-backend=lxml'''
+    global lxml_html
+    if lxml_html is None and HAS_LXML:
+        lxml_html = importlib.import_module('lxml.html')
+    return lxml_html
+
+
+class RegisteredPattern(object):
+    '''pattern of a `RegexRegistry`, compiled on its first use
+
+       has the methods of a compiled pattern, every call is counted
+       and timed while the registry profiles, `sub` with a function
+       includes the time of the function
+    '''
+
+    def __init__(self, registry: 'RegexRegistry', name: str, pattern: str, flags: int = 0):
+        self.registry = registry
+        self.name = name
+        self.pattern = pattern
+        self._flags = flags
+        self._regex = None
+
+    @property
+    def regex(self) -> Pattern:
+        if self._regex is None:
+            self._regex = re.compile(self.pattern, self._flags)
+        return self._regex
+
+    @property
+    def flags(self) -> int:
+        return self.regex.flags
+
+    @property
+    def groups(self) -> int:
+        return self.regex.groups
+
+    @property
+    def groupindex(self):
+        return self.regex.groupindex
+
+    def __repr__(self):
+        return '<RegisteredPattern {0} {1!r}>'.format(self.name, self.pattern)
+
+    def _call(self, method, *args, **kwargs):
+        if not self.registry.profile:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.registry.record(self.name, time.perf_counter() - start)
+
+    def _iter(self, iterator):
+        seconds = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    m = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                yield m
+        finally:
+            self.registry.record(self.name, seconds)
+
+    def search(self, *args, **kwargs) -> Optional[Match]:
+        return self._call(self.regex.search, *args, **kwargs)
+
+    def match(self, *args, **kwargs) -> Optional[Match]:
+        return self._call(self.regex.match, *args, **kwargs)
+
+    def fullmatch(self, *args, **kwargs) -> Optional[Match]:
+        return self._call(self.regex.fullmatch, *args, **kwargs)
+
+    def findall(self, *args, **kwargs) -> list:
+        return self._call(self.regex.findall, *args, **kwargs)
+
+    def split(self, *args, **kwargs) -> list:
+        return self._call(self.regex.split, *args, **kwargs)
+
+    def sub(self, *args, **kwargs) -> str:
+        return self._call(self.regex.sub, *args, **kwargs)
+
+    def subn(self, *args, **kwargs) -> Tuple[str, int]:
+        return self._call(self.regex.subn, *args, **kwargs)
+
+    def finditer(self, *args, **kwargs):
+        if not self.registry.profile:
+            return self.regex.finditer(*args, **kwargs)
+        return self._iter(self.regex.finditer(*args, **kwargs))
+
+
+class RegexRegistry(object):
+    '''precompiled patterns by name, see REGEX
+
+       With `profile` every call of a pattern is counted and timed,
+       `stats` is {name: [calls, seconds]}, see --generic-regex-profile.
+       Patterns which depend on the input are compiled by `dynamic`
+       and share the stats of their name.
+    '''
+
+    # patterns of `dynamic`
+    max_dynamic = 64
+
+    def __init__(self, profile: bool = False):
+        self.patterns = {}
+        self.profile = profile
+        self.stats = {}
+        self._dynamic = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, pattern: str, flags: int = 0) -> RegisteredPattern:
+        if name in self.patterns:
+            raise ValueError('Pattern already registered: {0}'.format(name))
+        regex = self.patterns[name] = RegisteredPattern(self, name, pattern, flags)
+        return regex
+
+    def dynamic(self, name: str, pattern: str, flags: int = 0) -> RegisteredPattern:
+        key = (name, pattern, flags)
+        regex = self._dynamic.get(key)
+        if regex is None:
+            if len(self._dynamic) >= self.max_dynamic:
+                self._dynamic.clear()
+            regex = self._dynamic[key] = RegisteredPattern(self, name, pattern, flags)
+        return regex
+
+    def __getitem__(self, name: str) -> RegisteredPattern:
+        return self.patterns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.patterns
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            stat = self.stats.setdefault(name, [0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+
+    def report(self) -> List[Tuple[str, int, float]]:
+        '''(name, calls, seconds) of every used pattern, slowest first'''
+        with self._lock:
+            report = [(name, calls, seconds) for name, (calls, seconds) in self.stats.items()]
+        return sorted(report, key=lambda stat: stat[2], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+
+REGEX = RegexRegistry()
+# Packer
+REGEX.add('packer_word', r'\b\w+\b')
+REGEX.add('packer_juicer_1', r"}\('(.*)', *(\d+|\[\]), *(\d+), *'(.*)'\.split\('\|'\), *(\d+), *(.*)\)\)", re.DOTALL)
+REGEX.add('packer_juicer_2', r"}\('(.*)', *(\d+|\[\]), *(\d+), *'(.*)'\.split\('\|'\)", re.DOTALL)
+REGEX.add('packer_strings', r'var *(_\w+)\=\["(.*?)"\];', re.DOTALL)
+# unpack_obfuscatorhtml
+REGEX.add('non_digit', r'\D')
+# unpack_u_m3u8
+REGEX.add('unicode_escape', r'\\u[0-9a-fA-F]{4}')
+# Generic.get_title
+REGEX.add('og_title', r'<meta\s*property="og:title"\s*content="(?P<title>[^<>]+)"\s*/?>')
+REGEX.add('title', r'<title[^<>]*>(?P<title>[^<>]+)</title>')
+REGEX.add('whitespace', r'[\s]+')
+# --generic-debug file name
+REGEX.add('filename_unsafe', r'(?u)[^-\w.]')
+# LxmlPageExtract, the <script> text of Generic._window_location_re
+REGEX.add('script_window_location', r'''window\.location\.href\s?=\s?["'](?P<url>[^"']+)["'];''')
+
 obfuscatorhtml_chunk_re = re.compile(r'''["'](?P<chunk>[A-z0-9+/=]+)["']''')
 obfuscatorhtml_re = re.compile(
     r'<script[^<>]*>[^<>]*var\s*(\w+)\s*=\s*\[(?P<chunks>[^\[\]]+)\];\s*\1\.forEach.*-\s*(?P<minus>\d+)[^<>]*</script>',
@@ -115,21 +313,48 @@ class Packer(object):
         except TypeError:
             raise UnpackingError('Unknown p.a.c.k.e.r. encoding.')
 
+        words = self._wordmap(symtab, radix)
+
         def lookup(match):
             """Look up symbols in the synthetic symtab."""
             word = match.group(0)
-            return symtab[unbase(word)] or word
+            symbol = words.get(word)
+            if symbol is None:
+                # not a p.a.c.k.e.r. encoded word
+                symbol = symtab[unbase(word)] or word
+            return symbol
 
-        source = re.sub(r'\b\w+\b', lookup, payload)
+        source = REGEX['packer_word'].sub(lookup, payload)
         return self._replacestrings(source)
 
+    @staticmethod
+    def _wordmap(symtab, radix):
+        """Map every encoded word of the symtab to its symbol."""
+        if radix == 1:
+            # int() is used for radix 1
+            alphabet, radix = '0123456789', 10
+        elif radix <= 36:
+            alphabet = Unbaser.ALPHABET[62][:radix]
+        else:
+            alphabet = Unbaser.ALPHABET[radix]
+
+        words = {}
+        for index, symbol in enumerate(symtab):
+            word = ''
+            number = index
+            while True:
+                number, digit = divmod(number, radix)
+                word = alphabet[digit] + word
+                if not number:
+                    break
+            words[word] = symbol or word
+        return words
+
     def _filterargs(self, source):
         """Juice from a source file the four args needed by decoder."""
-        juicers = [(r"}\('(.*)', *(\d+|\[\]), *(\d+), *'(.*)'\.split\('\|'\), *(\d+), *(.*)\)\)"),
-                   (r"}\('(.*)', *(\d+|\[\]), *(\d+), *'(.*)'\.split\('\|'\)"),
-                   ]
+        juicers = [REGEX['packer_juicer_1'], REGEX['packer_juicer_2']]
         for juicer in juicers:
-            args = re.search(juicer, source, re.DOTALL)
+            args = juicer.search(source)
             if args:
                 a = args.groups()
                 if a[1] == "[]":
@@ -146,19 +371,27 @@ class Packer(object):
 
     def _replacestrings(self, source):
         """Strip string lookup table (list) and replace values in source."""
-        match = re.search(r'var *(_\w+)\=\["(.*?)"\];', source, re.DOTALL)
+        match = REGEX['packer_strings'].search(source)
 
         if match:
             varname, strings = match.groups()
             startpoint = len(match.group(0))
             lookup = strings.split('","')
-            variable = '%s[%%d]' % varname
-            for index, value in enumerate(lookup):
-                source = source.replace(variable % index, '"%s"' % value)
+
+            def replace(m):
+                index = int(m.group(1))
+                if index < len(lookup):
+                    return '"%s"' % lookup[index]
+                return m.group(0)
+
+            source = REGEX.dynamic('packer_strings_index', r'%s\[(0|[1-9]\d*)\]' % re.escape(varname)).sub(replace, source)
             return source[startpoint:]
         return self.beginstr + source + self.endstr
 
 
+_unbaser_tables = {}
+
+
 class Unbaser(object):
     """Functor for a given base. Will efficiently convert
     strings to natural numbers."""
@@ -170,48 +403,97 @@ class Unbaser(object):
 
     def __init__(self, base):
         self.base = base
+        # decoded words, an Unbaser is only used for a single unpack
+        self.cache = {}
         # fill elements 37...61, if necessary
-        if 36 < base < 62:
-            if not hasattr(self.ALPHABET,
-                           self.ALPHABET[62][:base]):
-                self.ALPHABET[base] = self.ALPHABET[62][:base]
-        # attrs = self.ALPHABET
-        # print ', '.join("%s: %s" % item for item in attrs.items())
+        if 36 < base < 62 and base not in self.ALPHABET:
+            self.ALPHABET[base] = self.ALPHABET[62][:base]
         # If base can be handled by int() builtin, let it do it for us
         if 2 <= base <= 36:
             self.unbase = lambda s: int(s, base)
         else:
-            # Build conversion dictionary cache
+            self.dictionary = self.table(base)
+            self.unbase = self._dictunbaser
+
+    @classmethod
+    def table(cls, base):
+        """Conversion dictionary of a base, shared by every Unbaser."""
+        dictionary = _unbaser_tables.get(base)
+        if dictionary is None:
             try:
-                self.dictionary = dict(
-                    (cipher, index) for index, cipher in enumerate(self.ALPHABET[base]))
+                dictionary = dict(
+                    (cipher, index) for index, cipher in enumerate(cls.ALPHABET[base]))
             except KeyError:
                 raise TypeError('Unsupported base encoding.')
-            self.unbase = self._dictunbaser
+            _unbaser_tables[base] = dictionary
+        return dictionary
 
     def __call__(self, s):
-        return self.unbase(s)
+        try:
+            return self.cache[s]
+        except KeyError:
+            ret = self.cache[s] = self.unbase(s)
+            return ret
 
     def _dictunbaser(self, s):
         """Decodes a  value to an integer."""
+        base = self.base
+        dictionary = self.dictionary
         ret = 0
-        for index, cipher in enumerate(s[::-1]):
-            ret += (self.base ** index) * self.dictionary[cipher]
+        for cipher in s:
+            ret = ret * base + dictionary[cipher]
         return ret
 
 
+def _packer_replace(m: Match) -> Optional[str]:
+    """p.a.c.k.e.r replacement for a `unpack_packer_re` match"""
+    data = m.group(0)
+    packer = Packer()
+    if packer.detect(data):
+        try:
+            return packer.unpack(data).replace('\\', '')
+        except UnpackingError:
+            pass
+    return None
+
+
+def _obfuscatorhtml_replace(m: Match) -> str:
+    """Obfuscator HTML replacement for a `obfuscatorhtml_re` match"""
+    unpacked = ""
+    chunks = obfuscatorhtml_chunk_re.findall(m.group('chunks'))
+    minus = int(m.group('minus'))
+    for chunk in chunks:
+        int_chunk = int(REGEX['non_digit'].sub('', str(base64.b64decode(chunk))))
+        unpacked += chr(int_chunk - int(minus))
+    return unpacked
+
+
+def _unescape_replace(m: Match) -> str:
+    """document.write(unescape()) replacement for a `unpack_unescape_re` match"""
+    return unquote(m.group(1))
+
+
+def _source_url_replace(m: Match) -> str:
+    """atob() replacement for a `unpack_source_url_re_*` match"""
+    try:
+        atob = base64.b64decode(m.group("atob")).decode("utf-8")
+    except Exception:
+        atob = 'INVALID unpack_source_url'
+    return "{q}{atob}{q}".format(q=m.group("q"), atob=atob)
+
+
+def _u_m3u8_replace(m: Match) -> str:
+    """\\u0022 replacement for a `unpack_u_m3u8_re` match"""
+    unicode_escape = codecs.getdecoder('unicode_escape')
+    return REGEX['unicode_escape'].sub(lambda u: unicode_escape(u.group(0))[0], m.group(0))
+
+
 def unpack_packer(text: str) -> str:
     """unpack p.a.c.k.e.r"""
-    packer = Packer()
-    packer_list = unpack_packer_re.findall(text)
-    if packer_list:
-        for data in packer_list:
-            if packer.detect(data):
-                try:
-                    unpacked = packer.unpack(data).replace('\\', '')
-                    text = text.replace(data, unpacked)
-                except UnpackingError:
-                    pass
+    for m in unpack_packer_re.finditer(text):
+        unpacked = _packer_replace(m)
+        if unpacked is not None:
+            text = text.replace(m.group(0), unpacked)
     return text
 
 
@@ -222,13 +504,7 @@ def unpack_obfuscatorhtml(text: str) -> str:
     while True:
         m = obfuscatorhtml_re.search(text)
         if m:
-            unpacked = ""
-            chunks = obfuscatorhtml_chunk_re.findall(m.group('chunks'))
-            minus = int(m.group('minus'))
-            for chunk in chunks:
-                int_chunk = int(re.sub(r'\D', '', str(base64.b64decode(chunk))))
-                unpacked += chr(int_chunk - int(minus))
-            text = text.replace(m.group(0), unpacked)
+            text = text.replace(m.group(0), _obfuscatorhtml_replace(m))
         else:
             break
     return text
@@ -238,7 +514,7 @@ def unpack_unescape(text: str) -> str:
     while True:
         m = unpack_unescape_re.search(text)
         if m:
-            text = text.replace(m.group(0), unquote(m.group(1)))
+            text = text.replace(m.group(0), _unescape_replace(m))
         else:
             break
     return text
@@ -249,13 +525,7 @@ def unpack_source_url(text: str, _unpack_source_url_re: Pattern) -> str:
         m1 = _unpack_source_url_re.search(text)
         if m1:
             try:
-                atob = base64.b64decode(m1.group("atob")).decode("utf-8")
-            except Exception:
-                atob = 'INVALID unpack_source_url'
-
-            try:
-                atob = "{q}{atob}{q}".format(q=m1.group("q"), atob=atob)
-                text = text.replace(m1.group("replace"), atob)
+                text = text.replace(m1.group("replace"), _source_url_replace(m1))
             except Exception:
                 pass
         else:
@@ -264,52 +534,1443 @@ def unpack_source_url(text: str, _unpack_source_url_re: Pattern) -> str:
 
 
 def unpack_u_m3u8(text: str) -> str:
-    def _unicode_escape(s: str) -> str:
-        unicode_escape = codecs.getdecoder('unicode_escape')
-        return re.sub(r'\\u[0-9a-fA-F]{4}', lambda m: unicode_escape(m.group(0))[0], s)
-
     while True:
         m = unpack_u_m3u8_re.search(text)
         if m:
-            text = text.replace(m.group(0), _unicode_escape(m.group(0)))
+            text = text.replace(m.group(0), _u_m3u8_replace(m))
         else:
             break
     return text
 
 
+class UnpackRule(object):
+    """A single unpacker for the `Unpacker` engine.
+
+    - trigger: regex of the literal every match of `pattern` starts with
+    - literals: substrings every match of `pattern` contains,
+      the rule is skipped for a text without them
+    - pattern: regex of the packed code, matched at the trigger position
+    - replace: returns the unpacked code for a match, or None if it is invalid
+    - group: the match group that gets replaced
+    """
+
+    def __init__(self, name: str, trigger: str, literals: Tuple[str, ...],
+                 pattern: Pattern, replace: Callable[[Match], Optional[str]],
+                 group: Union[int, str] = 0):
+        self.name = name
+        self.trigger = trigger
+        self.literals = literals
+        self.pattern = pattern
+        self.replace = replace
+        self.group = group
+
+
+class Unpacker(object):
+    """Single pass unpacker for a list of `UnpackRule`
+
+    A literal substring gate selects the rules that could apply to a text,
+    the trigger literals of those rules are located with one combined
+    regex scan and the rules are only tried at those positions.
+    The output of a pass is built once. After a replacement, the unpacked
+    code can complete the literals of other rules or be enclosed by their
+    matches, the next passes scan the triggers of every rule and try the
+    rules of the gate of the new text. The first of them starts at the
+    beginning, a later one at the last trigger without a match before the
+    previous replacement, or at the unpacked code, at most `max_depth` times.
+
+    `stats` counts for every rule how often its gate let a text of `unpack`
+    through (hit) or skipped it (skip).
+    """
+
+    max_depth = 10
+
+    def __init__(self, rules: List[UnpackRule]):
+        self.rules = rules
+        self.literals = tuple(set(literal for rule in rules for literal in rule.literals))
+        self.stats = dict((rule.name, {'hit': 0, 'skip': 0}) for rule in rules)
+        self._scanners = {}
+
+    def _scanner(self, rules: Tuple[UnpackRule, ...]) -> Tuple[Pattern, Dict[str, List[UnpackRule]]]:
+        """combined trigger regex for `rules` and its group name to rules lookup"""
+        scanner = self._scanners.get(rules)
+        if scanner is None:
+            triggers = {}
+            for rule in rules:
+                triggers.setdefault(rule.trigger, []).append(rule)
+            trigger_names = {}
+            trigger_list = []
+            for index, trigger in enumerate(triggers):
+                trigger_names[f't{index}'] = triggers[trigger]
+                trigger_list.append(f'(?P<t{index}>{trigger})')
+            scanner = self._scanners[rules] = (re.compile('|'.join(trigger_list)), trigger_names)
+        return scanner
+
+    def gate(self, text: str) -> Tuple[UnpackRule, ...]:
+        """rules whose literals are all in `text`"""
+        found = set(literal for literal in self.literals if literal in text)
+        return tuple(rule for rule in self.rules if found.issuperset(rule.literals))
+
+    def unpack(self, text: str) -> str:
+        rules = self.gate(text)
+        for rule in self.rules:
+            self.stats[rule.name]['hit' if rule in rules else 'skip'] += 1
+        if not rules:
+            return text
+
+        text, pos = self._unpack_pass(text, 0, rules, self._scanner(rules))
+        if pos is None:
+            return text
+        # a rule which was not in the gate can enclose the unpacked code
+        scanner = self._scanner(tuple(self.rules))
+        pos = 0
+        for _ in range(self.max_depth):
+            rules = self.gate(text)
+            if not rules:
+                break
+            text, pos = self._unpack_pass(text, pos, rules, scanner)
+            if pos is None:
+                break
+        return text
+
+    def _unpack_pass(self, text: str, pos: int, rules: Tuple[UnpackRule, ...],
+                     scanner: Tuple[Pattern, Dict[str, List[UnpackRule]]]) -> Tuple[str, Optional[int]]:
+        """unpacks text from pos with `rules` at the triggers of `scanner`,
+        returns the text and the position of the next pass,
+        or None without a replacement"""
+        trigger_re, trigger_names = scanner
+        search = trigger_re.search
+        output = []
+        # length of the output and the output position of the next pass
+        length = 0
+        rescan = None
+        # output position of the last trigger without a match,
+        # it can match with the unpacked code of a later trigger
+        failed = None
+        last = 0
+        while True:
+            t = search(text, pos)
+            if t is None:
+                break
+            start = t.start()
+            for rule in trigger_names[t.lastgroup]:
+                if rule not in rules:
+                    continue
+                m = rule.pattern.match(text, start)
+                if m:
+                    unpacked = rule.replace(m)
+                    if unpacked is not None:
+                        break
+            else:
+                failed = length + start - last
+                pos = start + 1
+                continue
+
+            r_start, r_end = m.span(rule.group)
+            output.append(text[last:r_start])
+            length += r_start - last
+            # nested packed code and matches around the unpacked code
+            if rescan is None:
+                rescan = length if failed is None else failed
+            output.append(unpacked)
+            length += len(unpacked)
+            last = pos = r_end
+
+        if not output:
+            return text, None
+        output.append(text[last:])
+        return ''.join(output), rescan
+
+
+UNPACK_RULES = [
+    UnpackRule('packer', r'eval\(function\(p,a,c,k,e,', ('eval(function(p,a,c,k,e,',),
+               unpack_packer_re, _packer_replace),
+    UnpackRule('obfuscatorhtml', r'<script', ('<script', '.forEach'),
+               obfuscatorhtml_re, _obfuscatorhtml_replace),
+    UnpackRule('unescape', r'<script', ('<script', 'write(unescape('),
+               unpack_unescape_re, _unescape_replace),
+    UnpackRule('source_url_1', r'source:', ('source:', 'atob(', 'application/vnd.apple.mpegurl'),
+               unpack_source_url_re_1, _source_url_replace, 'replace'),
+    UnpackRule('source_url_2', r'var\s\w+url=', ('url=atob(',),
+               unpack_source_url_re_2, _source_url_replace, 'replace'),
+    UnpackRule('source_url_3', r'Clappr\.Player\(', ('Clappr.Player(', 'atob('),
+               unpack_source_url_re_3, _source_url_replace, 'replace'),
+    UnpackRule('u_m3u8', r'\\u0022', ('\\u0022', 'm3u8'),
+               unpack_u_m3u8_re, _u_m3u8_replace),
+]
+_unpacker = Unpacker(UNPACK_RULES)
+
+
 def unpack(text: str) -> str:
     """ unpack html source code """
-    text = unpack_packer(text)
-    text = unpack_obfuscatorhtml(text)
-    text = unpack_unescape(text)
-    text = unpack_source_url(text, unpack_source_url_re_1)
-    text = unpack_source_url(text, unpack_source_url_re_2)
-    text = unpack_source_url(text, unpack_source_url_re_3)
-    text = unpack_u_m3u8(text)
-    return text
+    return _unpacker.unpack(text)
 
 
 class GenericCache(object):
     '''GenericCache is useded as a temporary session cache
-       - GenericCache.blacklist_path
-       - GenericCache.cache_url_list
-       - GenericCache.whitelist_path
+       - GenericCache.resolve_cache
+       - GenericCache.ytdl_cache
+
+       every resolve chain has its own ResolveContext
     '''
     pass
 
 
+# ResolveContext of the current resolve chain, see Generic._get_streams
+_resolve_context = contextvars.ContextVar('generic_resolve_context', default=None)
+
+
+class ResolveContext(object):
+    '''ResolveContext is shared by every URL of one resolve chain
+
+       - `urls` are the URLs of the chain in their order,
+         the previous URL is the referer of a URL
+       - `in` uses a set of every URL
+       - a chain has at most `max_size` URLs
+       - other resolve chains, also in other threads, have their own context
+    '''
+
+    def __init__(self, max_size: int = 50):
+        self.max_size = max_size
+        self.urls: List[str] = []
+        self._visited = set()
+        self._lock = threading.Lock()
+        # --generic-blacklist-path and --generic-whitelist-path
+        self.blacklist_path = None
+        self.whitelist_path = None
+        # --generic-resolve-timeout
+        self.deadline = None
+        # requests and connections of the session before the chain
+        self.connection_stats = None
+        # youtube-dl streams of a URL, see Generic._ytdl_streams
+        self.ytdl_results = {}
+
+    @classmethod
+    def current(cls) -> Optional['ResolveContext']:
+        return _resolve_context.get()
+
+    @contextmanager
+    def activate(self):
+        '''URLs which are resolved inside are added to this context'''
+        token = _resolve_context.set(self)
+        try:
+            yield self
+        finally:
+            _resolve_context.reset(token)
+
+    def add(self, url: str) -> str:
+        '''adds a URL to the chain, returns its referer'''
+        with self._lock:
+            self.urls.append(url)
+            self._visited.add(url)
+            return self.urls[-2] if len(self.urls) > 1 else url
+
+    @property
+    def full(self) -> bool:
+        return len(self.urls) > self.max_size
+
+    def __contains__(self, url):
+        return url in self._visited
+
+    def __len__(self):
+        return len(self.urls)
+
+
+def cache_control_ttl(headers, ttl: int) -> Optional[int]:
+    '''TTL in seconds for a response, limited by its Cache-Control header
+
+       - None for `no-store`, the response should not be cached
+       - 0 for `no-cache`, the response must be revalidated
+    '''
+    cache_control = headers.get('Cache-Control', '').lower()
+    for directive in cache_control.split(','):
+        directive = directive.strip()
+        if directive == 'no-store':
+            return None
+        elif directive == 'no-cache':
+            ttl = 0
+        elif directive.startswith('max-age='):
+            try:
+                ttl = min(ttl, max(0, int(directive[8:].strip('" '))))
+            except ValueError:
+                pass
+    return ttl
+
+
+class PersistentCache(object):
+    '''PersistentCache is a SQLite key/value cache
+
+       - values are JSON serialized
+       - every value has an expiry time, expired values are kept
+         together with their ETag and Last-Modified validators,
+         until they are replaced or evicted
+       - the least recently used values are evicted
+         if there are more than `size` values
+    '''
+
+    def __init__(self, filename, table: str, size: int = 500):
+        self.filename = filename
+        self.table = table
+        self.size = size
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            import sqlite3
+            Path(self.filename).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.filename), timeout=5, check_same_thread=False)
+            self._db.execute(f'''CREATE TABLE IF NOT EXISTS {self.table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )''')
+            self._db.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed)')
+            self._db.commit()
+        return self._db
+
+    def get(self, key: str, stale: bool = False) -> Optional[Dict[str, Any]]:
+        '''cache entry with `value`, `expires`, `etag` and `last_modified`
+
+           expired entries are only returned with `stale`
+        '''
+        import sqlite3
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._connect()
+                row = db.execute(
+                    f'SELECT value, expires, etag, last_modified FROM {self.table} WHERE key = ?',
+                    (key,)).fetchone()
+                if row is None or (row[1] <= now and not stale):
+                    return None
+                db.execute(f'UPDATE {self.table} SET accessed = ? WHERE key = ?', (now, key))
+                db.commit()
+        except (OSError, sqlite3.Error) as e:
+            log.error('Cache {0}: {1}'.format(self.filename, e))
+            return None
+
+        return {
+            'value': json.loads(row[0]),
+            'expires': row[1],
+            'etag': row[2],
+            'last_modified': row[3],
+        }
+
+    def set(self, key: str, value: Any, ttl: float,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        import sqlite3
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._connect()
+                db.execute(
+                    f'INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, json.dumps(value), now + ttl, now, etag, last_modified))
+                db.execute(
+                    f'DELETE FROM {self.table} WHERE key IN '
+                    f'(SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                    (self.size,))
+                db.commit()
+        except (OSError, sqlite3.Error) as e:
+            log.error('Cache {0}: {1}'.format(self.filename, e))
+
+    def delete(self, key: str) -> None:
+        import sqlite3
+        try:
+            with self._lock:
+                db = self._connect()
+                db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                db.commit()
+        except (OSError, sqlite3.Error) as e:
+            log.error('Cache {0}: {1}'.format(self.filename, e))
+
+
+class YTDLPool(object):
+    '''YTDLPool is a thread-safe pool of YoutubeDL instances
+
+       - every streamlink session has its own pool, see `for_session`
+       - instances are reused with their extractors and caches,
+         like the player JS signature functions
+       - at most `size` idle instances are kept
+    '''
+
+    _pools = weakref.WeakKeyDictionary()
+    _pools_lock = threading.Lock()
+
+    def __init__(self, factory: Callable[[], Any], size: int = 2):
+        self.factory = factory
+        self.size = size
+        self.created = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_session(cls, session, factory: Callable[[], Any], size: int = 2) -> 'YTDLPool':
+        with cls._pools_lock:
+            pool = cls._pools.get(session)
+            if pool is None:
+                pool = cls._pools[session] = cls(factory, size=size)
+            return pool
+
+    @contextmanager
+    def checkout(self):
+        with self._lock:
+            ydl = self._idle.pop() if self._idle else None
+        if ydl is None:
+            ydl = self.factory()
+            with self._lock:
+                self.created += 1
+        try:
+            yield ydl
+        finally:
+            self.release(ydl)
+
+    def release(self, ydl) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(ydl)
+                return
+        ydl.__exit__(None, None, None)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ydl in idle:
+            ydl.__exit__(None, None, None)
+
+    @staticmethod
+    @contextmanager
+    def single(ydl):
+        '''an instance outside of the pool, closed after its use'''
+        try:
+            yield ydl
+        finally:
+            ydl.__exit__(None, None, None)
+
+
+# YoutubeDL instance of a YTDLProcessPool worker
+_ytdl_process_ydl = None
+
+
+def _ytdl_process_extract(url: str, ydl_opts: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    '''extract_info in a YTDLProcessPool worker, returns the slim info
+
+       YoutubeDL only reads socket_timeout when it is created,
+       an extraction with a socket_timeout uses its own instance
+    '''
+    global _ytdl_process_ydl
+    if 'socket_timeout' in ydl_opts:
+        with YTDLPool.single(import_youtube_dl().YoutubeDL(ydl_opts)) as ydl:
+            info = ydl.extract_info(url, download=False)
+    else:
+        if _ytdl_process_ydl is None:
+            _ytdl_process_ydl = import_youtube_dl().YoutubeDL(ydl_opts)
+        info = _ytdl_process_ydl.extract_info(url, download=False)
+    return ytdl_info_slim(info) if info else None
+
+
+class YTDLProcessPool(object):
+    '''YTDLProcessPool runs youtube-dl in worker processes
+
+       - the workers are kept for the next extraction
+       - if an extraction is slower than its timeout, every worker
+         is killed and the pool is replaced, the other extractions
+         of the killed workers are started again in the new pool
+       - workers are forked, the plugin module is not importable by name
+         for spawn or forkserver, a fork only copies the calling thread,
+         the workers only run `_ytdl_process_extract`
+    '''
+
+    _executor = None
+    _lock = threading.Lock()
+    # executors which were killed after the timeout of an extraction
+    _reset = weakref.WeakSet()
+
+    @classmethod
+    def available(cls) -> bool:
+        import multiprocessing
+        return 'fork' in multiprocessing.get_all_start_methods()
+
+    @classmethod
+    def executor(cls, workers: int):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('fork'))
+            return cls._executor
+
+    @classmethod
+    def extract_info(cls, url: str, ydl_opts: Dict[str, Any],
+                     timeout: Optional[float] = None, workers: int = 2) -> Optional[Dict[str, Any]]:
+        '''raises FutureTimeoutError or BrokenProcessPool
+
+           an extraction of a pool which was killed for the timeout
+           of another extraction is started again, once
+        '''
+        from concurrent.futures.process import BrokenProcessPool
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for retry in (True, False):
+            executor = cls.executor(workers)
+            try:
+                return executor.submit(_ytdl_process_extract, url, ydl_opts).result(
+                    timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                cls.kill(executor, reset=True)
+                raise
+            except (BrokenProcessPool, CancelledError) as e:
+                if retry and executor in cls._reset:
+                    log.debug('youtube-dl process pool was reset, retry {0}'.format(url))
+                    continue
+                cls.kill(executor)
+                if isinstance(e, CancelledError):
+                    raise BrokenProcessPool('youtube-dl process pool was reset') from e
+                raise
+
+    @classmethod
+    def kill(cls, executor=None, reset=False) -> None:
+        with cls._lock:
+            executor = executor or cls._executor
+            if executor is None:
+                return
+            if cls._executor is executor:
+                cls._executor = None
+            if reset:
+                cls._reset.add(executor)
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# youtube-dl info keys which are used by Generic.ytdl_fallback
+YTDL_INFO_KEYS = ('title', 'formats', 'requested_formats', 'http_headers')
+YTDL_FORMAT_KEYS = ('format_id', 'url', 'manifest_url', 'protocol', 'ext',
+                    'height', 'vcodec', 'acodec', 'abr', 'tbr', 'http_headers')
+# signed stream URLs, ?expire=1700000000 or /expire/1700000000/
+_ytdl_expire_re = REGEX.add('ytdl_expire', r'[?&/]expire[=/](\d{9,11})\b')
+
+
+def ytdl_info_slim(info: Dict[str, Any]) -> Dict[str, Any]:
+    '''youtube-dl info with only the keys of YTDL_INFO_KEYS and YTDL_FORMAT_KEYS'''
+    slim = {key: info[key] for key in YTDL_INFO_KEYS if info.get(key) is not None}
+    for key in ('formats', 'requested_formats'):
+        if key in slim:
+            slim[key] = [{k: fmt[k] for k in YTDL_FORMAT_KEYS if k in fmt} for fmt in slim[key]]
+    return slim
+
+
+def ytdl_info_ttl(info: Dict[str, Any], ttl: int, margin: int = 60) -> Optional[int]:
+    '''TTL in seconds for a youtube-dl info
+
+       - the earliest `expire` of every stream URL, less `margin`,
+         at most `ttl`
+       - `ttl` if there is no `expire`
+       - None if a stream URL is already expired
+    '''
+    expires = []
+    for key in ('formats', 'requested_formats'):
+        for fmt in info.get(key) or []:
+            for url_key in ('url', 'manifest_url'):
+                m = _ytdl_expire_re.search(fmt.get(url_key) or '')
+                if m:
+                    expires.append(int(m.group(1)))
+    if not expires:
+        return ttl
+    ttl = min(ttl, int(min(expires) - time.time()) - margin)
+    if ttl <= 0:
+        return None
+    return ttl
+
+
+class YTDLFormatIndex(object):
+    '''YTDLFormatIndex classifies the youtube-dl formats in one pass
+
+       - every format is video+audio, video or audio
+       - every video format is muxed with the best audio format,
+         see `best_audio`
+       - a video format is skipped without an audio format, or if
+         there was already a video+audio format of the same resolution
+       - without formats, the HLS and DASH manifests of the
+         requested formats are used, every manifest URL only once
+       - stream objects of formats are only created while the index
+         is iterated, the manifests are fetched in parallel and only once,
+         by `len` or the first iteration
+       - `len` is the number of streams, an index whose manifests
+         have no streams is empty
+    '''
+
+    MANIFEST_WORKERS = 4
+    HLS_PROTOCOLS = frozenset(('m3u8', 'm3u8_native'))
+    # container of a format by its extension, or by the codec prefix
+    CONTAINER_EXTS = {'mp4': 'mp4', 'm4a': 'mp4', 'm4v': 'mp4', 'mov': 'mp4', 'aac': 'mp4',
+                      'webm': 'webm', 'weba': 'webm', 'ogg': 'webm'}
+    CONTAINER_CODECS = (('avc', 'mp4'), ('h264', 'mp4'), ('hev', 'mp4'), ('hvc', 'mp4'),
+                        ('av01', 'mp4'), ('mp4a', 'mp4'), ('aac', 'mp4'), ('ac-3', 'mp4'),
+                        ('ec-3', 'mp4'), ('mp3', 'mp4'),
+                        ('vp8', 'webm'), ('vp9', 'webm'), ('vp09', 'webm'),
+                        ('opus', 'webm'), ('vorbis', 'webm'))
+
+    def __init__(self, session, info: Dict[str, Any]):
+        self.session = session
+        # (name, kind, format, audio format) in the order of the formats
+        self.entries: List[Tuple[Optional[str], str, Dict[str, Any], Optional[Dict[str, Any]]]] = []
+        formats = info.get('formats') or []
+
+        # (kind, manifest URL): streams, see fetch_manifests
+        self._manifests = None
+
+        self.audio_formats = [fmt for fmt in formats
+                              if fmt.get('acodec', 'none') != 'none' and fmt.get('vcodec', 'none') == 'none']
+        self._best_audio = {}
+
+        names_video_audio = set()
+        for fmt in formats:
+            video = fmt.get('vcodec', 'none') != 'none'
+            audio = fmt.get('acodec', 'none') != 'none'
+            if video:
+                name = f"{fmt.get('height', 'unknown')}p"
+                if audio:
+                    names_video_audio.add(name)
+                    self.entries.append((name, 'video_audio', fmt, None))
+                elif name not in names_video_audio:
+                    audio_fmt = self.best_audio(fmt)
+                    if audio_fmt:
+                        self.entries.append((name, 'video', fmt, audio_fmt))
+            elif audio:
+                self.entries.append((f"audio_{fmt.get('ext', 'unknown')}", 'audio', fmt, None))
+
+        if not formats:
+            manifest_urls = set()
+            for fmt in info.get('requested_formats') or []:
+                manifest_url = fmt.get('manifest_url') or ''
+                if manifest_url in manifest_urls:
+                    continue
+                manifest_urls.add(manifest_url)
+                if manifest_url.endswith('.m3u8'):
+                    self.entries.append((None, 'hls', fmt, None))
+                elif manifest_url.endswith('.mpd'):
+                    self.entries.append((None, 'dash', fmt, None))
+
+    @classmethod
+    def container(cls, fmt: Dict[str, Any], codec_key: str) -> Optional[str]:
+        '''mp4, webm or None'''
+        container = cls.CONTAINER_EXTS.get(fmt.get('ext'))
+        if container:
+            return container
+        codec = (fmt.get(codec_key) or '').lower()
+        return next((container for prefix, container in cls.CONTAINER_CODECS
+                     if codec.startswith(prefix)), None)
+
+    def best_audio(self, fmt: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        '''best audio format for a video format
+
+           1. the same container as the video
+           2. the same protocol as the video, HLS or not
+           3. the highest bitrate, abr or tbr
+
+           The audio format is only ranked once for every
+           container and protocol.
+        '''
+        key = (self.container(fmt, 'vcodec'), fmt.get('protocol') in self.HLS_PROTOCOLS)
+        if key not in self._best_audio:
+            container, hls = key
+
+            def rank(audio_fmt):
+                return (
+                    container is not None and self.container(audio_fmt, 'acodec') == container,
+                    (audio_fmt.get('protocol') in self.HLS_PROTOCOLS) == hls,
+                    audio_fmt.get('abr') or audio_fmt.get('tbr') or 0,
+                )
+
+            self._best_audio[key] = max(self.audio_formats, key=rank, default=None)
+        return self._best_audio[key]
+
+    @property
+    def names(self) -> List[str]:
+        '''stream names, without the streams of HLS and DASH manifests'''
+        return [name for name, kind, fmt, audio_fmt in self.entries if name]
+
+    def __len__(self):
+        manifests = self.fetch_manifests()
+        return sum(len(manifests[(kind, fmt['manifest_url'])]) if kind in ('hls', 'dash') else 1
+                   for name, kind, fmt, audio_fmt in self.entries)
+
+    def __iter__(self):
+        return self.streams()
+
+    def _stream(self, fmt):
+        if fmt.get('protocol') in self.HLS_PROTOCOLS:
+            return HLSStream(self.session, fmt['url'], headers=fmt.get('http_headers'))
+        return HTTPStream(self.session, fmt['url'], headers=fmt.get('http_headers'))
+
+    def _manifest_streams(self, kind: str, manifest_url: str) -> List[Tuple[str, Any]]:
+        try:
+            if kind == 'hls':
+                streams = []
+                for quality, hls_stream in HLSStream.parse_variant_playlist(self.session, manifest_url).items():
+                    log.debug(f"{hls_stream.to_manifest_url}")
+                    streams.append((f"{quality}", hls_stream))
+                return streams
+            return [(f"{quality}p", dash_stream)
+                    for quality, dash_stream in DASHStream.parse_manifest(self.session, manifest_url).items()]
+        except Exception as e:
+            log.error(f"Error parsing {'HLS playlist' if kind == 'hls' else 'DASH manifest'}: {e}")
+            return []
+
+    def fetch_manifests(self) -> Dict[Tuple[str, str], List[Tuple[str, Any]]]:
+        '''streams of every HLS and DASH manifest, fetched in parallel'''
+        if self._manifests is None:
+            manifests = [(kind, fmt['manifest_url']) for name, kind, fmt, audio_fmt in self.entries
+                         if kind in ('hls', 'dash')]
+            futures = {}
+            if manifests:
+                executor = ThreadPoolExecutor(max_workers=min(len(manifests), self.MANIFEST_WORKERS),
+                                              thread_name_prefix='generic-manifest')
+                try:
+                    for manifest in manifests:
+                        futures[manifest] = executor.submit(self._manifest_streams, *manifest)
+                finally:
+                    executor.shutdown(wait=False)
+            self._manifests = dict((manifest, future.result()) for manifest, future in futures.items())
+        return self._manifests
+
+    def streams(self):
+        manifests = self.fetch_manifests()
+        for name, kind, fmt, audio_fmt in self.entries:
+            if kind in ('video_audio', 'audio'):
+                yield name, self._stream(fmt)
+            elif kind == 'video':
+                yield name, MuxedStream(self.session, self._stream(fmt), self._stream(audio_fmt))
+            else:
+                yield from manifests[(kind, fmt['manifest_url'])]
+
+
+class SuffixTrie(object):
+    '''SuffixTrie finds the suffixes of a string, like `str.endswith`
+
+       a trie of the reversed suffixes, the values of a suffix
+       are saved with the key None
+    '''
+
+    def __init__(self, items=()):
+        self.root = {}
+        for suffix, value in items:
+            self.add(suffix, value)
+
+    def add(self, suffix: str, value: Any = True) -> None:
+        node = self.root
+        for char in reversed(suffix):
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(value)
+
+    def values(self, text: str):
+        '''values of every suffix of text, the shortest suffix first'''
+        node = self.root
+        if None in node:
+            yield from node[None]
+        for char in reversed(text):
+            node = node.get(char)
+            if node is None:
+                return
+            if None in node:
+                yield from node[None]
+
+    def __contains__(self, text):
+        return next(self.values(text), None) is not None
+
+    def __bool__(self):
+        return bool(self.root)
+
+
+class PrefixTrie(object):
+    '''PrefixTrie finds a prefix of a string, like `str.startswith`'''
+
+    def __init__(self, prefixes=()):
+        self.root = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix: str) -> None:
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def __contains__(self, text):
+        node = self.root
+        if None in node:
+            return True
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+    def __bool__(self):
+        return bool(self.root)
+
+
+class URLFilter(object):
+    '''URLFilter checks a URL with the rules of Generic._make_url_list
+
+       every rule list is compiled into a SuffixTrie or PrefixTrie,
+       a URL is checked in the order of the rules,
+       `reason` returns the reason of the first rule which removes the URL
+    '''
+
+    def __init__(self,
+                 whitelist_netloc=(),
+                 whitelist_path=(),
+                 blacklist_netloc_static=(),
+                 blacklist_netloc=(),
+                 blacklist_path=(),
+                 blacklist_endswith=(),
+                 blacklist_filepath=(),
+                 ads_path_re=None,
+                 blacklist_path_same=()):
+        self.whitelist_netloc = SuffixTrie((netloc, True) for netloc in whitelist_netloc)
+        self.whitelist_path = self._path_trie(whitelist_path)
+        self.blacklist_netloc_static = SuffixTrie((netloc, True) for netloc in blacklist_netloc_static)
+        self.blacklist_netloc = SuffixTrie((netloc, True) for netloc in blacklist_netloc)
+        self.blacklist_path = self._path_trie(blacklist_path)
+        self.blacklist_endswith = SuffixTrie((path, True) for path in blacklist_endswith)
+        self.blacklist_filepath = SuffixTrie((path, True) for path in blacklist_filepath)
+        self.ads_path_re = ads_path_re
+        # netloc suffix: exact paths
+        self.blacklist_path_same = SuffixTrie()
+        paths_same = {}
+        for netloc, path in blacklist_path_same:
+            paths_same.setdefault(netloc, set()).add(path)
+        for netloc, paths in paths_same.items():
+            self.blacklist_path_same.add(netloc, frozenset(paths))
+
+    @staticmethod
+    def _path_trie(netloc_path_list) -> SuffixTrie:
+        '''netloc suffix: PrefixTrie of the paths'''
+        paths = {}
+        for netloc, path in netloc_path_list:
+            paths.setdefault(netloc, []).append(path)
+        return SuffixTrie((netloc, PrefixTrie(path_list)) for netloc, path_list in paths.items())
+
+    @staticmethod
+    def _match_path(trie: SuffixTrie, parsed_url) -> bool:
+        return any(parsed_url.path in paths for paths in trie.values(parsed_url.netloc))
+
+    def reason(self, parsed_url, url_type: str = '') -> Optional[str]:
+        '''reason why the URL is removed, None for a valid URL'''
+        netloc = parsed_url.netloc
+        path = parsed_url.path
+        if not parsed_url.scheme.startswith('http'):
+            # Allow only an url with a valid scheme
+            return 'SCHEME'
+        if url_type == 'iframe':
+            if self.whitelist_netloc and netloc not in self.whitelist_netloc:
+                # Allow only whitelisted domains for iFrames
+                # --generic-whitelist-netloc
+                return 'WL-netloc'
+            if self.whitelist_path and not self._match_path(self.whitelist_path, parsed_url):
+                # Allow only whitelisted paths from a domain for iFrames
+                # --generic-whitelist-path
+                return 'WL-path'
+        if netloc in self.blacklist_netloc_static:
+            # Removes blacklisted domains from a static list
+            # Generic.blacklist_netloc
+            return 'BL-static'
+        if netloc in self.blacklist_netloc:
+            # Removes blacklisted domains
+            # --generic-blacklist-netloc
+            return 'BL-netloc'
+        if self._match_path(self.blacklist_path, parsed_url):
+            # Removes blacklisted paths from a domain
+            # --generic-blacklist-path
+            return 'BL-path'
+        if path in self.blacklist_endswith:
+            # Removes unwanted endswith images and chatrooms
+            return 'BL-ew'
+        if path in self.blacklist_filepath:
+            # Removes blacklisted file paths
+            # --generic-blacklist-filepath
+            return 'BL-filepath'
+        if (self.ads_path_re and self.ads_path_re.search(path)) or netloc.startswith('ads.'):
+            # Removes obviously AD URL
+            return 'ADS'
+        if any(path in paths for paths in self.blacklist_path_same.values(netloc)):
+            # Removes blacklisted same paths from a domain
+            return 'BL-path-same'
+        return None
+
+
+@functools.lru_cache(maxsize=16)
+def compile_url_filter(**rules) -> URLFilter:
+    '''URLFilter, only compiled once for the same rules'''
+    return URLFilter(**rules)
+
+
+class _RunEnd(object):
+    '''end of a run of chars which are not matched by `stop_re`
+
+       the last run is remembered, every char is only scanned once,
+       if the positions are ascending or descending
+    '''
+
+    def __init__(self, text: str, stop_re: Pattern):
+        self.text = text
+        self.stop_re = stop_re
+        self.start = self.end = -1
+
+    def __call__(self, pos: int) -> int:
+        if self.start <= pos <= self.end:
+            return self.end
+        if pos < self.start:
+            m = self.stop_re.search(self.text, pos, self.start)
+            end = m.start() if m else self.end
+        else:
+            m = self.stop_re.search(self.text, pos)
+            end = m.start() if m else len(self.text)
+        self.start, self.end = pos, end
+        return end
+
+
+# Generic._playlist_re
+_playlist_opener_re = REGEX.add('playlist_opener', r'["\'=]|&quot;')
+_playlist_url_stop_re = REGEX.add('playlist_url_stop', r'["\'<>\s;{}]')
+_playlist_query_stop_re = REGEX.add('playlist_query_stop', r'["\'<>\s\\{}]')
+_playlist_extensions = ('m3u8', 'mp3', 'mp4', 'mpd')
+_playlist_title_re = REGEX.add('playlist_title', r'title=["\']|["\']title["\']:["\']')
+# Generic._iframe_re
+_iframe_head_re = REGEX.add('iframe_head', r'(?i)<ifr(?:["\']\s?\+\s?["\'])?ame')
+_iframe_name_re = REGEX.add('iframe_name', r'(?i)\sname=["\']g_iFrame')
+_iframe_src_re = REGEX.add('iframe_src', r'(?i)src=')
+_iframe_url_stop_re = REGEX.add('iframe_url_stop', r'["\'\s<>]')
+_iframe_tag_end_re = REGEX.add('iframe_tag_end', r'[<>]')
+
+
+def _quote_end(text: str, pos: int) -> Optional[int]:
+    '''end of the quote, whitespace or > after a playlist URL at pos'''
+    if pos >= len(text):
+        return None
+    char = text[pos]
+    if char == '\\':
+        if pos + 1 < len(text) and text[pos + 1] in '"\'':
+            return pos + 2
+        if text.startswith('\\&quot;', pos):
+            return pos + 7
+        return None
+    if char in '"\'>':
+        return pos + 1
+    if char.isspace() and text[pos - 1] != ';':
+        return pos + 1
+    return None
+
+
+class _PlaylistScanner(object):
+    '''playlist URL of an opener of `Generic._playlist_re`
+
+       `_playlist_re` backtracks over every quote of a long line,
+       the scanner finds the last valid extension of every run of URL chars
+       only once, every char is scanned a constant number of times.
+    '''
+
+    def __init__(self, text: str):
+        self.text = text
+        self.title_re = _playlist_title_re.regex
+        self.url_end = _RunEnd(text, _playlist_url_stop_re.regex)
+        self.query_end = _RunEnd(text, _playlist_query_stop_re.regex)
+        # run end: (extension dot, url end, match end) of the last valid extension
+        self.best = {}
+
+    def valid_extension(self, dot: int) -> Optional[Tuple[int, int]]:
+        text = self.text
+        ext_end = None
+        for ext in _playlist_extensions:
+            if text.startswith(ext, dot + 1):
+                ext_end = dot + 1 + len(ext)
+                break
+        if ext_end is None:
+            return None
+        # ?query
+        if ext_end < len(text) and text[ext_end] == '?':
+            end = self.query_end(ext_end + 1)
+            if end > ext_end + 1:
+                match_end = _quote_end(text, end)
+                if match_end is not None:
+                    return end, match_end
+        # /?
+        pos = ext_end + 1 if ext_end < len(text) and text[ext_end] == '/' else ext_end
+        match_end = _quote_end(text, pos)
+        if match_end is not None:
+            return ext_end, match_end
+        return None
+
+    def last_extension(self, start: int, end: int) -> Optional[Tuple[int, int, int]]:
+        if end not in self.best:
+            self.best[end] = None
+            dot = self.text.rfind('.', start + 1, end)
+            while dot > start:
+                result = self.valid_extension(dot)
+                if result:
+                    self.best[end] = (dot,) + result
+                    break
+                dot = self.text.rfind('.', start + 1, dot)
+        return self.best[end]
+
+    def match(self, start: int) -> Optional[Tuple[str, int, int]]:
+        '''(url, url start, match end) of the URL at start, after an opener'''
+        text = self.text
+        # (?<!title=["']) and (?<!["']title["']:["'])
+        if self.title_re.fullmatch(text, max(start - 7, 0), start) \
+                or self.title_re.fullmatch(text, max(start - 9, 0), start):
+            return None
+        result = self.last_extension(start, self.url_end(start))
+        if result and result[0] > start:
+            return text[start:result[1]], start, result[2]
+        return None
+
+
+def scan_playlist(text: str):
+    '''playlist URLs of text, the same URLs as `Generic._playlist_re.finditer`
+
+       Yields (url, url start, match end)
+    '''
+    scanner = _PlaylistScanner(text)
+    opener_re = _playlist_opener_re.regex
+    pos = 0
+    while True:
+        m = opener_re.search(text, pos)
+        if not m:
+            return
+        pos = m.start() + 1
+        result = scanner.match(m.end())
+        if result:
+            yield result
+            pos = result[2]
+
+
+class _IframeScanner(object):
+    '''iframe URL of an <iframe of `Generic._iframe_re`
+
+       `_iframe_re` searches the rest of the text for a valid src=
+       for every <iframe, the scanner checks every src= only once.
+    '''
+
+    def __init__(self, text: str):
+        self.text = text
+        self.url_end = _RunEnd(text, _iframe_url_stop_re.regex)
+        self.tag_end = _RunEnd(text, _iframe_tag_end_re.regex)
+        self.src_re = _iframe_src_re.regex
+        self.head_re = _iframe_head_re.regex
+        self.name_re = _iframe_name_re.regex
+        # every src= from `searched_from` to `found` is invalid,
+        # found is (src= position, result) or None for the end of the text
+        self.searched_from = None
+        self.found = None
+
+    def valid_src(self, src: int) -> Optional[Tuple[str, int, int]]:
+        text = self.text
+        start = src + 4
+        if start >= len(text) or text[start] not in '"\'':
+            return None
+        start += 1
+        end = self.url_end(start)
+        if end == start or end >= len(text):
+            return None
+        pos = end
+        if text[pos].isspace():
+            pos += 1
+        if pos >= len(text) or text[pos] not in '"\'':
+            return None
+        pos = self.tag_end(pos + 1)
+        if pos >= len(text) or text[pos] != '>':
+            return None
+        return text[start:end], start, pos + 1
+
+    def first_valid_src(self, pos: int) -> Optional[Tuple[str, int, int]]:
+        found = self.found
+        if self.searched_from is not None and self.searched_from <= pos and (found is None or pos <= found[0]):
+            return found and found[1]
+        self.searched_from, self.found = pos, None
+        for m in self.src_re.finditer(self.text, pos):
+            result = self.valid_src(m.start())
+            if result:
+                self.found = (m.start(), result)
+                break
+        return self.found and self.found[1]
+
+    def match(self, pos: int) -> Optional[Tuple[str, int, int]]:
+        '''(url, url start, match end) of an iframe at pos'''
+        m = self.head_re.match(self.text, pos)
+        if not m or self.name_re.match(self.text, m.end()):
+            return None
+        return self.first_valid_src(m.end())
+
+
+def scan_iframe(text: str):
+    '''iframe URLs of text, the same URLs as `Generic._iframe_re.finditer`
+
+       Yields (url, url start, match end)
+    '''
+    scanner = _IframeScanner(text)
+    head_re = scanner.head_re
+    pos = 0
+    while True:
+        m = head_re.search(text, pos)
+        if not m:
+            return
+        pos = m.start() + 1
+        result = scanner.match(m.start())
+        if result:
+            yield result
+            pos = result[2]
+
+
+# Generic._window_location_re, javascript redirection
+_window_location_re = re.compile(r'''(?sx)
+    <script[^<]+window\.location\.href\s?=\s?["']
+    (?P<url>[^"']+)["'];[^<>]+
+''')
+_og_title_re = REGEX['og_title']
+_title_re = REGEX['title']
+
+
+class PageExtract(object):
+    '''playlists, iframes, window.location and title of a website in one pass
+
+       - playlist: (url, url start, match end) like scan_playlist
+       - iframe: (url, url start, match end) like scan_iframe
+       - window_location: (url, url start, match end) of the first
+         `_window_location_re` or None
+       - og_title, title: (title, title start, match end) of the first
+         `_og_title_re` and `_title_re` or None
+
+       A single trigger regex finds every position where one of them
+       can start, the playlist and iframe scanners keep their own positions.
+    '''
+    _trigger_re = REGEX.add('page_trigger', r'(?P<opener>["\'=]|&quot;)|(?P<iframe><[iI][fF][rR])|<(?P<tag>script|meta|title)')
+    _tag_res = {
+        'script': ('window_location', _window_location_re, 'url'),
+        'meta': ('og_title', _og_title_re, 'title'),
+        'title': ('title', _title_re, 'title'),
+    }
+
+    def __init__(self, text: str):
+        self.text = text
+        self.playlist = []
+        self.iframe = []
+        self.window_location = None
+        self.og_title = None
+        self.title = None
+
+        playlist = _PlaylistScanner(text)
+        iframe = _IframeScanner(text)
+        playlist_pos = iframe_pos = 0
+        for m in self._trigger_re.regex.finditer(text):
+            kind = m.lastgroup
+            if kind == 'opener':
+                if m.start() >= playlist_pos:
+                    result = playlist.match(m.end())
+                    if result:
+                        self.playlist.append(result)
+                        playlist_pos = result[2]
+            elif kind == 'iframe':
+                if m.start() >= iframe_pos:
+                    result = iframe.match(m.start())
+                    if result:
+                        self.iframe.append(result)
+                        iframe_pos = result[2]
+            else:
+                attr, tag_re, group = self._tag_res[m.group('tag')]
+                if getattr(self, attr) is None:
+                    tag = tag_re.match(text, m.start())
+                    if tag:
+                        setattr(self, attr, (tag.group(group), tag.start(group), tag.end()))
+
+    def urls(self, name: str) -> List[str]:
+        '''URLs of playlist or iframe'''
+        return [url for url, start, end in getattr(self, name)]
+
+
+class LxmlPageExtract(PageExtract):
+    '''PageExtract of the lxml HTML tree, see --generic-extract-backend
+
+       A single walk over the tree collects
+       - iframe: src of every <iframe>, in any attribute order and line,
+         and the iframes of the inline <script> text
+       - playlist: every attribute value with a playlist extension,
+         like video/source src, data-src or href, the playlist URLs of
+         quoted attribute values and of the inline <script> text
+       - og: content of every <meta property="og:*">
+       - window_location: the first window.location.href of a <script>
+       - title: text of the first <title>
+
+       The values are (value, None, None), a tree has no text offsets.
+       ValueError if lxml is not installed or can not parse the text.
+    '''
+    _playlist_suffixes = tuple('.' + ext for ext in _playlist_extensions)
+
+    def __init__(self, text: str):
+        lxml = import_lxml()
+        if lxml is None:
+            raise ValueError('lxml is not installed')
+        try:
+            root = lxml.document_fromstring(text)
+        except (lxml.etree.ParserError, ValueError) as err:
+            raise ValueError(str(err))
+
+        self.text = text
+        self.playlist = []
+        self.iframe = []
+        self.og = {}
+        self.window_location = None
+        self.og_title = None
+        self.title = None
+
+        for element in root.iter():
+            tag = element.tag
+            if not isinstance(tag, str):
+                # comments and processing instructions
+                continue
+            for name, value in element.items():
+                value = value.strip()
+                if not value:
+                    continue
+                if tag == 'iframe' and name == 'src':
+                    if not (element.get('name') or '').lower().startswith('g_iframe'):
+                        self.iframe.append((value, None, None))
+                elif self._is_playlist(value):
+                    self.playlist.append((value, None, None))
+                elif '"' in value or "'" in value:
+                    # JSON or javascript of an attribute
+                    self._scan(value)
+            if tag == 'script':
+                script = element.text
+                if script:
+                    self._scan(script)
+                    self.iframe.extend((url, None, None) for url, start, end in scan_iframe(script))
+                    if self.window_location is None:
+                        m = REGEX['script_window_location'].search(script)
+                        if m:
+                            self.window_location = (m.group('url'), None, None)
+            elif tag == 'meta':
+                prop = element.get('property') or ''
+                if prop.startswith('og:') and prop not in self.og:
+                    self.og[prop] = element.get('content') or ''
+            elif tag == 'title':
+                if self.title is None and element.text:
+                    self.title = (element.text, None, None)
+
+        if self.og.get('og:title'):
+            self.og_title = (self.og['og:title'], None, None)
+
+    def _scan(self, text: str):
+        '''playlist URLs of a script or attribute text'''
+        self.playlist.extend((url, None, None) for url, start, end in scan_playlist(text))
+
+    @classmethod
+    def _is_playlist(cls, url: str) -> bool:
+        if any(char.isspace() for char in url):
+            return False
+        try:
+            parsed = urlparse(url)
+        except ValueError:
+            return False
+        return parsed.path.endswith(cls._playlist_suffixes) or parsed.query.endswith(cls._playlist_suffixes)
+
+
 @pluginmatcher(re.compile(r'((?:generic|resolve)://)(?P<url>.+)'), priority=HIGH_PRIORITY)
 @pluginmatcher(re.compile(r'(?P<url>.+)'), priority=1)
-
+@pluginargument(
+    "ytdl-order",
+    choices=["first", "last", "race"],
+    help="""
+    When to try youtube-dl for a URL.
+
+    first: before the website is resolved (default)
+    last: after the website is resolved without streams
+    race: together with the website, the first streams are used
+    """,
+)
+@pluginargument(
+    "ytdl-pool-size",
+    metavar="NUMBER",
+    type=num(int, ge=0),
+    default=2,
+    help="""
+    Number of idle youtube-dl instances which are kept
+    for the next youtube-dl fallback of the same session.
+
+    Default is 2
+    """,
+)
+@pluginargument(
+    "ytdl-process",
+    action="store_true",
+    help="""
+    Run youtube-dl in worker processes instead of the streamlink process,
+    --generic-ytdl-pool-size is the number of worker processes.
+    """,
+)
+@pluginargument(
+    "ytdl-timeout",
+    metavar="SECONDS",
+    type=num(float, gt=0),
+    default=60,
+    help="""
+    Seconds until a --generic-ytdl-process worker is killed
+    and replaced by a new worker.
+
+    Default is 60
+    """,
+)
+@pluginargument(
+    "pool-connections",
+    metavar="NUMBER",
+    type=num(int, ge=1),
+    help="""
+    Number of hosts with a connection pool,
+    the connections of these hosts are kept alive for every iframe URL.
+
+    Default is 10
+    """,
+)
+@pluginargument(
+    "pool-maxsize",
+    metavar="NUMBER",
+    type=num(int, ge=1),
+    help="""
+    Maximum number of connections which are kept alive for a host,
+    use at least --generic-playlist-workers.
+
+    Default is 10
+    """,
+)
+@pluginargument(
+    "resolve-timeout",
+    metavar="SECONDS",
+    type=num(float, gt=0),
+    help="""
+    Maximum seconds for the whole resolve, including every iframe
+    and playlist URL. Streams which were found until then are used.
+    """,
+)
+@pluginargument(
+    "playlist-workers",
+    metavar="NUMBER",
+    type=num(int, ge=1, le=32),
+    default=1,
+    help="""
+    Number of HLS and DASH playlist URLs which are fetched in parallel.
+
+    Default is 1
+    """,
+)
+@pluginargument(
+    "playlist-timeout",
+    metavar="SECONDS",
+    type=num(float, gt=0),
+    help="""
+    Seconds to wait for a playlist URL of --generic-playlist-workers,
+    the playlist URL is skipped afterwards.
+    """,
+)
+@pluginargument(
+    "resolve-cache",
+    action="store_true",
+    help="""
+    Cache the playlist and iframe URLs of every website on disk
+    and use them again, without downloading the website, until they expire.
+
+    youtube-dl results are also cached, until their stream URLs expire.
+    """,
+)
+@pluginargument(
+    "resolve-cache-ttl",
+    metavar="SECONDS",
+    type=num(int, ge=0),
+    default=3600,
+    help="""
+    Seconds until a --generic-resolve-cache entry expires,
+    a shorter max-age of the website response is used instead.
+
+    Default is 3600
+    """,
+)
+@pluginargument(
+    "resolve-cache-size",
+    metavar="NUMBER",
+    type=num(int, ge=1),
+    default=500,
+    help="""
+    Maximum number of --generic-resolve-cache entries,
+    the least recently used entries are removed.
+
+    Default is 500
+    """,
+)
+@pluginargument(
+    "html-stream",
+    action="store_true",
+    help="""
+    Read the website content in chunks and stop reading it
+    as soon as enough valid playlist URLs were found,
+    see --generic-playlist-max.
+    """,
+)
+@pluginargument(
+    "max-document-size",
+    metavar="SIZE",
+    type=filesize,
+    help="""
+    Maximum size of a website, only the first bytes of a larger website
+    are read and used. This limits the memory of huge websites,
+    a website below the limit needs the same memory as without it.
+
+    Example: --generic-max-document-size 10M
+    """,
+)
+@pluginargument(
+    "trace-memory",
+    action="store_true",
+    help="""
+    Log the peak memory of every resolve, measured with tracemalloc
+    until the last stream and its playlist are resolved.
+    """,
+)
+@pluginargument(
+    "extract-backend",
+    choices=["regex", "lxml"],
+    help="""
+    How playlist, iframe and window.location URLs and the title
+    are extracted from a website.
+
+    regex: scan the text of the website (default)
+    lxml: walk the HTML tree, if lxml is installed,
+          the regex scan is used if lxml can not parse the website
+    """,
+)
+@pluginargument(
+    "regex-profile",
+    action="store_true",
+    help="""
+    Count and time the calls of the registered regular expressions
+    and log the slowest after every resolve.
+    """,
+)
 class Generic(Plugin):
-    # iframes
+    # iframes, see scan_iframe
     _iframe_re = re.compile(r'''(?isx)
         <ifr(?:["']\s?\+\s?["'])?ame
         (?!\sname=["']g_iFrame).*?src=
         ["'](?P<url>[^"'\s<>]+)\s?["']
         [^<>]*?>
     ''')
-    # playlists
+    # playlists, see scan_playlist
     _playlist_re = re.compile(r'''(?sx)
         (?:["']|=|&quot;)(?P<url>
             (?<!title=["'])
@@ -332,11 +1993,8 @@ class Generic(Plugin):
     _httpstream_common_resolution_list = [
         '2160', '1440', '1080', '720', '576', '480', '360', '240',
     ]
-    # javascript redirection
-    _window_location_re = re.compile(r'''(?sx)
-        <script[^<]+window\.location\.href\s?=\s?["']
-        (?P<url>[^"']+)["'];[^<>]+
-    ''')
+    # javascript redirection, see PageExtract
+    _window_location_re = _window_location_re
     # obviously ad paths
     _ads_path_re = re.compile(r'''(?x)
         /ads?/?(?:\w+)?
@@ -372,26 +2030,126 @@ class Generic(Plugin):
     )
     # END - _make_url_list
 
+    # START - _res_text_stream
+    # size of a single chunk
+    html_stream_chunk_size = 64 * 1024
+    # chars of the previous chunk, which are scanned again for a playlist URL
+    html_stream_overlap = 4096
+    # END - _res_text_stream
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.url = update_scheme('http://', self.match.group('url'), force=False)
         self.html_text = ''
+        self._page_extract = None
+        self.res_headers = {}
+        # the candidates of _get_website are from the resolve cache
+        self._resolve_cache_hit = False
 
         # START - cache every used url and set a referer
-        if hasattr(GenericCache, 'cache_url_list'):
-            GenericCache.cache_url_list += [self.url]
-            # set the last url as a referer
-            self.referer = GenericCache.cache_url_list[-2]
-        else:
-            GenericCache.cache_url_list = [self.url]
-            self.referer = self.url
-        self.session.http.headers.update({'Referer': self.referer})
+        # an iframe URL is resolved inside of _get_streams
+        # and uses the context of its resolve chain
+        self.context = ResolveContext.current()
+        if self.context is None:
+            self.context = ResolveContext()
+            # --generic-resolve-timeout for every url of this resolve
+            resolve_timeout = self.get_option('resolve_timeout')
+            self.context.deadline = time.monotonic() + resolve_timeout if resolve_timeout else None
+            self._pool_setup()
+            self.context.connection_stats = self._connection_stats()
+        # the last url is the referer
+        # the Referer is sent with every request, see _res_get
+        self.referer = self.context.add(self.url)
         # END
 
         # START - how often _get_streams already run
-        self._run = len(GenericCache.cache_url_list)
+        self._run = len(self.context)
         # END
 
+    def _pool_setup(self):
+        '''--generic-pool-connections and --generic-pool-maxsize
+           for the HTTP adapters of the session'''
+        pool_connections = self.get_option('pool_connections')
+        pool_maxsize = self.get_option('pool_maxsize')
+        if not pool_connections and not pool_maxsize:
+            return
+        for prefix, adapter in self.session.http.adapters.items():
+            if not isinstance(adapter, requests.adapters.HTTPAdapter):
+                continue
+            connections = pool_connections or adapter._pool_connections
+            maxsize = pool_maxsize or adapter._pool_maxsize
+            if (connections, maxsize) != (adapter._pool_connections, adapter._pool_maxsize):
+                log.debug('Connection pool {0} {1} hosts, {2} connections'.format(prefix, connections, maxsize))
+                adapter.init_poolmanager(connections, maxsize, block=adapter._pool_block)
+
+    def _connection_stats(self):
+        '''number of requests and new connections of the session'''
+        stats = {'requests': 0, 'connections': 0}
+        for adapter in self.session.http.adapters.values():
+            poolmanager = getattr(adapter, 'poolmanager', None)
+            if poolmanager is None:
+                continue
+            for key in poolmanager.pools.keys():
+                pool = poolmanager.pools.get(key)
+                if pool is not None:
+                    stats['requests'] += pool.num_requests
+                    stats['connections'] += pool.num_connections
+        return stats
+
+    def _log_connection_stats(self):
+        '''new and reused connections since the first URL'''
+        start = self.context.connection_stats
+        if start is None:
+            return
+        stats = self._connection_stats()
+        requests_count = stats['requests'] - start['requests']
+        connections = stats['connections'] - start['connections']
+        log.debug('Connections: {0} requests, {1} new, {2} reused'.format(
+            requests_count, connections, max(requests_count - connections, 0)))
+
+    def _trace_memory(self):
+        '''starts tracemalloc for --generic-trace-memory,
+           True if it was not running before'''
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            return False
+        tracemalloc.start()
+        return True
+
+    def _log_memory(self, started):
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        log.debug('Memory: {0:.1f} MiB peak, {1:.1f} MiB current'.format(peak / 1048576, current / 1048576))
+        if started:
+            tracemalloc.stop()
+
+    def _log_regex_stats(self, limit=10):
+        '''calls and time of the slowest registered patterns'''
+        for name, calls, seconds in REGEX.report()[:limit]:
+            log.debug('Regex {0}: {1} calls, {2:.4f}s'.format(name, calls, seconds))
+
+    def _remaining(self):
+        '''seconds left until the --generic-resolve-timeout deadline,
+           None without a deadline'''
+        deadline = self.context.deadline
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
+
+    def _check_deadline(self):
+        '''raises NoStreamsError after the --generic-resolve-timeout deadline
+
+           Returns the timeout for the next request, None without a deadline
+        '''
+        remaining = self._remaining()
+        if remaining is None:
+            return None
+        if remaining <= 0:
+            log.error('Resolve timeout, see --generic-resolve-timeout')
+            raise NoStreamsError(self.url)
+        return min(remaining, self.session.http.timeout)
+
     def compare_url_path(self, parsed_url, check_list,
                          path_status='startswith'):
         status = False
@@ -435,10 +2193,11 @@ class Generic(Plugin):
             new_url = urljoin(base_url, new_url)
         return new_url
 
-    def _make_url_list(self, old_list, base_url, url_type=''):
+    def _url_filter(self):
+        '''URLFilter of the static and user lists'''
         # START - List for not allowed URL Paths
         # --generic-blacklist-path
-        if not hasattr(GenericCache, 'blacklist_path'):
+        if self.context.blacklist_path is None:
 
             # static list
             blacklist_path = [
@@ -454,25 +2213,39 @@ class Generic(Plugin):
                 blacklist_path = self.merge_path_list(
                     blacklist_path, blacklist_path_user)
 
-            GenericCache.blacklist_path = blacklist_path
+            self.context.blacklist_path = blacklist_path
         # END
 
-        blacklist_path_same = [
+        blacklist_path_same = (
             ('player.vimeo.com', '/video/'),
             ('youtube.com', '/embed/'),
-        ]
+        )
 
         # START - List of only allowed URL Paths for Iframes
         # --generic-whitelist-path
-        if not hasattr(GenericCache, 'whitelist_path'):
+        if self.context.whitelist_path is None:
             whitelist_path = []
             whitelist_path_user = self.get_option('whitelist_path')
             if whitelist_path_user is not None:
                 whitelist_path = self.merge_path_list(
                     [], whitelist_path_user)
-            GenericCache.whitelist_path = whitelist_path
+            self.context.whitelist_path = whitelist_path
         # END
 
+        return compile_url_filter(
+            whitelist_netloc=tuple(self.get_option('whitelist_netloc') or ()),
+            whitelist_path=tuple(self.context.whitelist_path),
+            blacklist_netloc_static=self.blacklist_netloc,
+            blacklist_netloc=tuple(self.get_option('blacklist_netloc') or ()),
+            blacklist_path=tuple(self.context.blacklist_path),
+            blacklist_endswith=self.blacklist_endswith,
+            blacklist_filepath=tuple(self.get_option('blacklist_filepath') or ()),
+            ads_path_re=self._ads_path_re,
+            blacklist_path_same=blacklist_path_same,
+        )
+
+    def _make_url_list(self, old_list, base_url, url_type=''):
+        url_filter = self._url_filter()
         allow_same_url = (self.get_option('ignore_same_url'))
 
         new_list = []
@@ -482,65 +2255,25 @@ class Generic(Plugin):
             parse_new_url = urlparse(new_url)
 
             # START
-            REMOVE = False
-            if new_url in GenericCache.cache_url_list and not allow_same_url:
+            if new_url in self.context and not allow_same_url:
                 # Removes an already used url
                 # ignored if --hls-session-reload is used
                 REMOVE = 'SAME-URL'
-            elif (not parse_new_url.scheme.startswith(('http'))):
-                # Allow only an url with a valid scheme
-                REMOVE = 'SCHEME'
-            elif (url_type == 'iframe'
-                    and self.get_option('whitelist_netloc')
-                    and parse_new_url.netloc.endswith(tuple(self.get_option('whitelist_netloc'))) is False):
-                # Allow only whitelisted domains for iFrames
-                # --generic-whitelist-netloc
-                REMOVE = 'WL-netloc'
-            elif (url_type == 'iframe'
-                    and GenericCache.whitelist_path
-                    and self.compare_url_path(parse_new_url, GenericCache.whitelist_path) is False):
-                # Allow only whitelisted paths from a domain for iFrames
-                # --generic-whitelist-path
-                REMOVE = 'WL-path'
-            elif (parse_new_url.netloc.endswith(self.blacklist_netloc)):
-                # Removes blacklisted domains from a static list
-                # self.blacklist_netloc
-                REMOVE = 'BL-static'
-            elif (self.get_option('blacklist_netloc')
-                  and parse_new_url.netloc.endswith(tuple(self.get_option('blacklist_netloc')))):
-                # Removes blacklisted domains
-                # --generic-blacklist-netloc
-                REMOVE = 'BL-netloc'
-            elif (self.compare_url_path(parse_new_url, GenericCache.blacklist_path) is True):
-                # Removes blacklisted paths from a domain
-                # --generic-blacklist-path
-                REMOVE = 'BL-path'
-            elif (parse_new_url.path.endswith(self.blacklist_endswith)):
-                # Removes unwanted endswith images and chatrooms
-                REMOVE = 'BL-ew'
-            elif (self.get_option('blacklist_filepath')
-                  and parse_new_url.path.endswith(tuple(self.get_option('blacklist_filepath')))):
-                # Removes blacklisted file paths
-                # --generic-blacklist-filepath
-                REMOVE = 'BL-filepath'
-            elif (self._ads_path_re.search(parse_new_url.path) or parse_new_url.netloc.startswith(('ads.'))):
-                # Removes obviously AD URL
-                REMOVE = 'ADS'
-            elif (self.compare_url_path(parse_new_url, blacklist_path_same, path_status='==') is True):
-                # Removes blacklisted same paths from a domain
-                REMOVE = 'BL-path-same'
-            elif parse_new_url.netloc == 'cdn.embedly.com' and parse_new_url.path == '/widgets/media.html':
-                # do not use the direct URL for 'cdn.embedly.com', search the query for a new URL
-                params = dict(parse_qsl(parse_new_url.query))
-                embedly_new_url = params.get('url') or params.get('src')
-                if embedly_new_url:
-                    new_list += [embedly_new_url]
-                else:
-                    log.error('Missing params URL or SRC for {0}'.format(new_url))
-                continue
             else:
-                # valid URL
-                new_list += [new_url]
+                REMOVE = url_filter.reason(parse_new_url, url_type)
+
+            if not REMOVE:
+                if parse_new_url.netloc == 'cdn.embedly.com' and parse_new_url.path == '/widgets/media.html':
+                    # do not use the direct URL for 'cdn.embedly.com', search the query for a new URL
+                    params = dict(parse_qsl(parse_new_url.query))
+                    embedly_new_url = params.get('url') or params.get('src')
+                    if embedly_new_url:
+                        new_list += [embedly_new_url]
+                    else:
+                        log.error('Missing params URL or SRC for {0}'.format(new_url))
+                else:
+                    # valid URL
+                    new_list += [new_url]
                 continue
 
             log.debug('{0} - Removed: {1}'.format(REMOVE, new_url))
@@ -551,20 +2284,58 @@ class Generic(Plugin):
         new_list = sorted(list(set(new_list)))
         return new_list
 
-    def _window_location(self):
-        match = self._window_location_re.search(self.html_text)
-        if match:
-            temp_url = urljoin(self.url, match.group('url'))
-            if temp_url not in GenericCache.cache_url_list:
+    def _window_location(self, location=None):
+        if location is None:
+            window_location = self._page().window_location
+            location = window_location[0] if window_location else ''
+        if location:
+            temp_url = urljoin(self.url, location)
+            if temp_url not in self.context:
                 log.debug('Found window_location: {0}'.format(temp_url))
                 return temp_url
 
         log.trace('No window_location')
         return False
 
+    def _playlist_type(self, parsed_url):
+        if (parsed_url.path.endswith(('.m3u8'))
+                or parsed_url.query.endswith(('.m3u8'))):
+            return 'hls'
+        elif (parsed_url.path.endswith(('.mp3', '.mp4'))
+                or parsed_url.query.endswith(('.mp3', '.mp4'))):
+            return 'http'
+        elif (parsed_url.path.endswith(('.mpd'))
+                or parsed_url.query.endswith(('.mpd'))):
+            return 'dash'
+        return None
+
+    def _playlist_streams(self, url, playlist_type, **kwargs):
+        '''list of streams of a single playlist URL'''
+        if playlist_type == 'hls':
+            streams = list(HLSStream.parse_variant_playlist(self.session, url, **kwargs).items())
+            if not streams:
+                streams = [('live', HLSStream(self.session, url, **kwargs))]
+            return streams
+        elif playlist_type == 'dash':
+            return list(DASHStream.parse_manifest(self.session, url, **kwargs).items())
+
+        name = 'vod'
+        m = self._httpstream_bitrate_re.search(url)
+        if m:
+            bitrate = m.group('bitrate')
+            resolution = m.group('resolution')
+            if bitrate:
+                if bitrate in self._httpstream_common_resolution_list:
+                    name = '{0}p'.format(m.group('bitrate'))
+                else:
+                    name = '{0}k'.format(m.group('bitrate'))
+            elif resolution:
+                name = resolution
+        return [(name, HTTPStream(self.session, url, **kwargs))]
+
     def _resolve_playlist(self, playlist_all):
+        # the headers are saved in the streams and used for every request
         playlist_referer = self.get_option('playlist_referer') or self.url
-        self.session.http.headers.update({'Referer': playlist_referer})
 
         playlist_max = self.get_option('playlist_max') or 5
         count_playlist = {
@@ -578,77 +2349,85 @@ class Generic(Plugin):
             '.cloudfront.net',
         )
 
+        # --generic-playlist-workers
+        # HLS and DASH playlists are fetched in parallel,
+        # the streams are still returned in the order of playlist_all
+        # --generic-resolve-timeout
+        # playlists are always fetched in a thread pool with a deadline,
+        # a late playlist can't block the resolve
+        workers = self.get_option('playlist_workers') or 1
+        executor = None
+        if workers > 1 or self._remaining() is not None:
+            executor = ThreadPoolExecutor(max_workers=workers,
+                                          thread_name_prefix='generic-playlist')
+        playlist_timeout = self.get_option('playlist_timeout')
+
+        jobs = []
         for url in playlist_all:
             parsed_url = urlparse(url)
+            kwargs = {'headers': {'Referer': playlist_referer}}
             if parsed_url.netloc.endswith(origin_tuple):
-                self.session.http.headers.update({
-                    'Origin': '{0}://{1}'.format(o.scheme, o.netloc),
-                })
+                kwargs['headers']['Origin'] = '{0}://{1}'.format(o.scheme, o.netloc)
+            playlist_type = self._playlist_type(parsed_url)
+            future = None
+            if executor and playlist_type in ('hls', 'dash'):
+                future = executor.submit(self._playlist_streams, url, playlist_type, **kwargs)
+            jobs.append((url, playlist_type, kwargs, future))
 
-            if (parsed_url.path.endswith(('.m3u8'))
-                    or parsed_url.query.endswith(('.m3u8'))):
-                if count_playlist['hls'] >= playlist_max:
-                    log.debug('Skip - {0}'.format(url))
+        try:
+            for url, playlist_type, kwargs, future in jobs:
+                remaining = self._remaining()
+                if remaining is not None and remaining <= 0:
+                    log.error('Resolve timeout, skip the remaining playlists')
+                    break
+                if playlist_type is None:
+                    log.error('parsed URL - {0}'.format(url))
                     continue
-                try:
-                    streams = HLSStream.parse_variant_playlist(self.session, url).items()
-                    if not streams:
-                        yield 'live', HLSStream(self.session, url)
-                    for s in streams:
-                        yield s
-                    log.debug('HLS URL - {0}'.format(url))
-                    count_playlist['hls'] += 1
-                except Exception as e:
-                    log.error('Skip HLS with error {0}'.format(str(e)))
-            elif (parsed_url.path.endswith(('.mp3', '.mp4'))
-                    or parsed_url.query.endswith(('.mp3', '.mp4'))):
-                if count_playlist['http'] >= playlist_max:
+                if count_playlist[playlist_type] >= playlist_max:
+                    if future:
+                        future.cancel()
                     log.debug('Skip - {0}'.format(url))
                     continue
                 try:
-                    name = 'vod'
-                    m = self._httpstream_bitrate_re.search(url)
-                    if m:
-                        bitrate = m.group('bitrate')
-                        resolution = m.group('resolution')
-                        if bitrate:
-                            if bitrate in self._httpstream_common_resolution_list:
-                                name = '{0}p'.format(m.group('bitrate'))
-                            else:
-                                name = '{0}k'.format(m.group('bitrate'))
-                        elif resolution:
-                            name = resolution
-                    yield name, HTTPStream(self.session, url)
-                    log.debug('HTTP URL - {0}'.format(url))
-                    count_playlist['http'] += 1
-                except Exception as e:
-                    log.error('Skip HTTP with error {0}'.format(str(e)))
-            elif (parsed_url.path.endswith(('.mpd'))
-                    or parsed_url.query.endswith(('.mpd'))):
-                if count_playlist['dash'] >= playlist_max:
-                    log.debug('Skip - {0}'.format(url))
+                    if future:
+                        timeout = playlist_timeout
+                        if remaining is not None:
+                            timeout = min(timeout or remaining, remaining)
+                        streams = future.result(timeout=timeout)
+                    else:
+                        streams = self._playlist_streams(url, playlist_type, **kwargs)
+                except FutureTimeoutError:
+                    log.error('Skip {0} with timeout {1}'.format(playlist_type.upper(), url))
                     continue
-                try:
-                    for s in DASHStream.parse_manifest(self.session,
-                                                       url).items():
-                        yield s
-                    log.debug('DASH URL - {0}'.format(url))
-                    count_playlist['dash'] += 1
                 except Exception as e:
-                    log.error('Skip DASH with error {0}'.format(str(e)))
-            else:
-                log.error('parsed URL - {0}'.format(url))
-
-    def _res_text(self, url):
+                    log.error('Skip {0} with error {1}'.format(playlist_type.upper(), str(e)))
+                    continue
+                for s in streams:
+                    yield s
+                log.debug('{0} URL - {1}'.format(playlist_type.upper(), url))
+                count_playlist[playlist_type] += 1
+        finally:
+            if executor:
+                for url, playlist_type, kwargs, future in jobs:
+                    if future:
+                        future.cancel()
+                executor.shutdown(wait=False)
+            self._log_connection_stats()
+
+    def _res_get(self, url, headers=None, **kwargs):
+        headers = dict({'Referer': self.referer}, **(headers or {}))
+        timeout = self._check_deadline()
+        if timeout is not None:
+            kwargs.setdefault('timeout', timeout)
         try:
-            res = self.session.http.get(url, allow_redirects=True)
+            res = self.session.http.get(url, headers=headers, allow_redirects=True, **kwargs)
         except Exception as e:
             if 'Received response with content-encoding: gzip' in str(e):
-                headers = {
+                headers = dict(headers, **{
                     'User-Agent': useragents.FIREFOX,
                     'Accept-Encoding': 'deflate'
-                }
-                res = self.session.http.get(url, headers=headers, allow_redirects=True)
+                })
+                res = self.session.http.get(url, headers=headers, allow_redirects=True, **kwargs)
             elif '403 Client Error' in str(e):
                 log.error('Website Access Denied/Forbidden, you might be geo-'
                           'blocked or other params are missing.')
@@ -663,7 +2442,232 @@ class Generic(Plugin):
             for resp in res.history:
                 log.debug('Redirect: {0} - {1}'.format(resp.status_code, resp.url))
             log.debug('URL: {0}'.format(res.url))
-        return res.text
+        self.res_headers = res.headers
+        return res
+
+    def _res_text(self, url, res=None):
+        '''website content, see --generic-max-document-size'''
+        max_size = self.get_option('max_document_size')
+        if not max_size:
+            return (res if res is not None else self._res_get(url)).text
+        if res is None:
+            res = self._res_get(url, stream=True)
+        return self._res_text_bounded(res, max_size)
+
+    def _res_text_bounded(self, res, max_size):
+        '''the first max_size bytes of the website content,
+           every chunk is decoded on its own, there is no full copy of the bytes'''
+        decoder = codecs.getincrementaldecoder(res.encoding or 'utf-8')(errors='replace')
+        chunks = []
+        size = 0
+        try:
+            for chunk in res.iter_content(chunk_size=self.html_stream_chunk_size):
+                if size + len(chunk) > max_size:
+                    chunks.append(decoder.decode(memoryview(chunk)[:max_size - size]))
+                    log.warning('Website is larger than {0} bytes, the rest is not used'.format(max_size))
+                    break
+                size += len(chunk)
+                chunks.append(decoder.decode(chunk))
+            else:
+                chunks.append(decoder.decode(b'', final=True))
+        finally:
+            res.close()
+        return ''.join(chunks)
+
+    def _res_text_stream(self, url, res=None):
+        '''GET website content in chunks,
+           stops as soon as --generic-playlist-max valid playlist URLs are found.
+
+           Returns the website content and the valid playlist URLs,
+           the list is only used for an incomplete website content.
+        '''
+        playlist_max = self.get_option('playlist_max') or 5
+        max_size = self.get_option('max_document_size')
+        overlap = self.html_stream_overlap
+
+        if res is None:
+            res = self._res_get(url, stream=True)
+        decoder = codecs.getincrementaldecoder(res.encoding or 'utf-8')(errors='replace')
+        chunks = []
+        length = 0
+        window = ''
+        size = 0
+        playlist_all = []
+        playlist_list = []
+        try:
+            for chunk in res.iter_content(chunk_size=self.html_stream_chunk_size):
+                if max_size and size >= max_size:
+                    log.warning('Website is larger than {0} bytes, the rest is not used'.format(max_size))
+                    break
+                if max_size and size + len(chunk) > max_size:
+                    chunk = memoryview(chunk)[:max_size - size]
+                size += len(chunk)
+                remaining = self._remaining()
+                if remaining is not None and remaining <= 0:
+                    if playlist_list:
+                        log.error('Resolve timeout, stopped reading the website')
+                        return ''.join(chunks), playlist_list
+                    self._check_deadline()
+                text = decoder.decode(chunk)
+                if not text:
+                    continue
+                chunks.append(text)
+                # matches ending in the overlap were found with the previous window
+                window = window[-overlap:] + text
+                scanned = len(window) - len(text)
+                length += len(text)
+                new_playlist = [url for url, start, end in scan_playlist(window)
+                                if end > scanned]
+                if not new_playlist:
+                    continue
+                playlist_all += new_playlist
+                playlist_list = self._make_url_list(playlist_all,
+                                                    self.url,
+                                                    url_type='playlist',
+                                                    )
+                if len(playlist_list) >= playlist_max:
+                    log.debug('Stopped reading the website after {0} chars'.format(length))
+                    return ''.join(chunks), playlist_list
+            else:
+                chunks.append(decoder.decode(b'', final=True))
+        finally:
+            res.close()
+        return ''.join(chunks), []
+
+    def _resolve_cache(self):
+        '''PersistentCache of --generic-resolve-cache'''
+        if not self.get_option('resolve_cache'):
+            return None
+        if not hasattr(GenericCache, 'resolve_cache'):
+            GenericCache.resolve_cache = PersistentCache(
+                CACHE_DIR / 'generic-cache.sqlite',
+                'resolve',
+                size=self.get_option('resolve_cache_size') or 500)
+        return GenericCache.resolve_cache
+
+    def _ytdl_cache(self):
+        '''PersistentCache of --generic-resolve-cache for youtube-dl'''
+        if not self.get_option('resolve_cache'):
+            return None
+        if not hasattr(GenericCache, 'ytdl_cache'):
+            GenericCache.ytdl_cache = PersistentCache(
+                CACHE_DIR / 'generic-cache.sqlite',
+                'ytdl',
+                size=self.get_option('resolve_cache_size') or 500)
+        return GenericCache.ytdl_cache
+
+    def _resolve_cache_ttl(self):
+        '''TTL of the last website response for the resolve cache'''
+        ttl = self.get_option('resolve_cache_ttl')
+        if ttl is None:
+            ttl = 3600
+        return cache_control_ttl(self.res_headers, ttl)
+
+    def _res_revalidate(self, url, cached):
+        '''Conditional GET for an expired resolve cache entry
+
+           Returns the response, or None if the website was not modified.
+        '''
+        headers = {}
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+        res = self._res_get(url, headers=headers, stream=True)
+        if res.status_code == 304:
+            res.close()
+            return None
+        return res
+
+    def _get_website(self, use_cache=True):
+        '''GET, unpack and extract the website content
+
+           Returns the candidates of the website,
+           or the valid playlist URLs of an incomplete website content.
+           Without `use_cache` the website is always fetched.
+        '''
+        cache = self._resolve_cache()
+        cached = cache.get(self.url, stale=True) if cache and use_cache else None
+        self._resolve_cache_hit = False
+        res = None
+        if cached and cached['expires'] <= time.time():
+            if not (cached['etag'] or cached['last_modified']):
+                cached = None
+            else:
+                res = self._res_revalidate(self.url, cached)
+                if res is not None:
+                    cached = None
+                else:
+                    log.debug('Not modified: {0}'.format(self.url))
+                    ttl = self._resolve_cache_ttl()
+                    if ttl is not None:
+                        cache.set(self.url, cached['value'], ttl,
+                                  etag=self.res_headers.get('ETag') or cached['etag'],
+                                  last_modified=self.res_headers.get('Last-Modified') or cached['last_modified'])
+
+        if cached:
+            log.debug('Resolve cache: {0}'.format(self.url))
+            # only the candidates and the title are cached, not the website
+            candidates = cached['value']
+            if self.title is None:
+                self.title = candidates['title']
+            self._resolve_cache_hit = True
+            return candidates, []
+
+        # GET website content
+        if self.get_option('html_stream'):
+            self.html_text, playlist_list = self._res_text_stream(self.url, res)
+            if playlist_list:
+                return None, playlist_list
+        else:
+            self.html_text = self._res_text(self.url, res)
+        # unpack common javascript codes
+        self.html_text = unpack(self.html_text)
+        log.trace('Unpack gates: {0}'.format(_unpacker.stats))
+
+        if self.get_option('debug'):
+            _valid_filepath = REGEX['filename_unsafe'].sub('', str(self.url).strip().replace(' ', '_'))
+            _new_file = os.path.join(Path().absolute(),
+                                     f'{self._run}_{_valid_filepath}.html')
+            log.warning(f'NEW DEBUG FILE! {_new_file}')
+            try:
+                with open(_new_file, 'w+') as f:
+                    # in chunks, without an encoded copy of the whole website
+                    for pos in range(0, len(self.html_text), self.html_stream_chunk_size):
+                        f.write(self.html_text[pos:pos + self.html_stream_chunk_size])
+            except OSError:
+                pass
+
+        candidates = self._candidates()
+        if cache:
+            ttl = self._resolve_cache_ttl()
+            if ttl is not None:
+                cache.set(self.url, dict(candidates, title=self.get_title()), ttl,
+                          etag=self.res_headers.get('ETag'),
+                          last_modified=self.res_headers.get('Last-Modified'))
+        return candidates, []
+
+    def _page(self):
+        '''PageExtract of html_text, only once for the same text'''
+        if self._page_extract is None or self._page_extract.text is not self.html_text:
+            self._page_extract = None
+            if self.get_option('extract_backend') == 'lxml':
+                try:
+                    self._page_extract = LxmlPageExtract(self.html_text)
+                except ValueError as err:
+                    log.debug('lxml backend: {0}, using regex'.format(err))
+            if self._page_extract is None:
+                self._page_extract = PageExtract(self.html_text)
+        return self._page_extract
+
+    def _candidates(self):
+        '''playlist, iframe and window.location URLs of the website'''
+        page = self._page()
+        return {
+            'playlist': page.urls('playlist'),
+            'iframe': page.urls('iframe'),
+            'window_location': page.window_location[0] if page.window_location else '',
+        }
 
     def get_author(self):
         parsed = urlparse(self.url)
@@ -678,20 +2682,81 @@ class Generic(Plugin):
         if self.title is None:
             if not self.html_text:
                 self.html_text = self._res_text(self.url)
-            _og_title_re = re.compile(r'<meta\s*property="og:title"\s*content="(?P<title>[^<>]+)"\s*/?>')
-            _title_re = re.compile(r'<title[^<>]*>(?P<title>[^<>]+)</title>')
-            m = _og_title_re.search(self.html_text) or _title_re.search(self.html_text)
-            if m:
-                self.title = re.sub(r'[\s]+', ' ', m.group('title'))
-                self.title = re.sub(r'^\s*|\s*$', '', self.title)
-                self.title = html_unescape(self.title)
+            page = self._page()
+            title = page.og_title or page.title
+            if title:
+                self.title = REGEX['whitespace'].sub(' ', title[0]).strip()
+                # lxml has already decoded the entities
+                if not isinstance(page, LxmlPageExtract):
+                    self.title = html_unescape(self.title)
             if self.title is None:
                 # fallback if there is no <title>
                 self.title = self.url
         return self.title
 
-    def ytdl_fallback(self):
-        '''Basic support for m3u8 URLs with youtube-dl'''
+    def _ytdl_streams(self):
+        '''ytdl_fallback only once for every URL of the resolve chain,
+           a URL without streams is also saved'''
+        ytdl_results = self.context.ytdl_results
+        if self.url not in ytdl_results:
+            ytdl_results[self.url] = self.ytdl_fallback()
+        else:
+            log.debug('Cached youtube-dl result')
+        return ytdl_results[self.url]
+
+    def _race_website_streams(self):
+        '''website streams of the race, the playlists are resolved in its thread'''
+        streams = self._get_website_streams()
+        if streams is None:
+            return None
+        return list(streams.items() if isinstance(streams, dict) else streams)
+
+    def _ytdl_race(self):
+        '''--generic-ytdl-order=race
+
+           the website and youtube-dl are resolved in their own threads,
+           the first non-empty result is used, NoStreamsError of one side
+           is an empty result. Returns the streams, the empty website
+           streams or None if both are empty.
+        '''
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='generic-race')
+        try:
+            # every thread resolves in the ResolveContext of this chain
+            ytdl = executor.submit(contextvars.copy_context().run, self._ytdl_streams)
+            website = executor.submit(contextvars.copy_context().run, self._race_website_streams)
+        finally:
+            executor.shutdown(wait=False)
+
+        error = empty = None
+        pending = {ytdl, website}
+        while pending:
+            remaining = self._remaining()
+            done, pending = wait(pending, timeout=None if remaining is None else max(remaining, 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                log.error('Resolve timeout, see --generic-resolve-timeout')
+                raise NoStreamsError(self.url)
+            for future in done:
+                try:
+                    streams = future.result()
+                except NoStreamsError as e:
+                    error = e
+                    continue
+                if streams:
+                    log.debug('{0} was faster'.format('youtube-dl' if future is ytdl else 'The website'))
+                    return streams
+                if future is website:
+                    empty = streams
+        if empty is None and error is not None:
+            raise error
+        return empty
+
+    def _ytdl_extract_info(self):
+        '''youtube-dl info of the URL, None on errors'''
+        youtube_dl = import_youtube_dl()
+        if youtube_dl is None:
+            log.error('Could not import {0}, skip youtube-dl'.format(' or '.join(YTDL_MODULES)))
+            return None
         log.debug(f'Fallback {youtube_dl.__name__} {youtube_dl.version.__version__}')
 
         class YTDL_Logger(object):
@@ -722,113 +2787,189 @@ class Generic(Plugin):
             #'cookies': cookie_file_path,
         }
 
-        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+        remaining = self._remaining()
+        if remaining is not None and remaining <= 0:
+            log.error('Resolve timeout, skip {0}'.format(youtube_dl.__name__))
+            return None
+
+        pool_size = self.get_option('ytdl_pool_size')
+        if self.get_option('ytdl_process') and YTDLProcessPool.available():
+            from concurrent.futures.process import BrokenProcessPool
+            # the logger is not picklable
+            del ydl_opts['logger']
+            timeout = self.get_option('ytdl_timeout') or 60
+            if remaining is not None:
+                ydl_opts['socket_timeout'] = remaining
+                timeout = min(timeout, remaining)
             try:
-                info = ydl.extract_info(self.url, download=False)
+                return YTDLProcessPool.extract_info(
+                    self.url, ydl_opts, timeout=timeout,
+                    workers=max(2 if pool_size is None else pool_size, 1))
+            except FutureTimeoutError:
+                log.error('Timeout, killed the {0} process'.format(youtube_dl.__name__))
+            except BrokenProcessPool as e:
+                log.error('Broken {0} process: {1}'.format(youtube_dl.__name__, e))
             except Exception as e:
                 log.error(f"Error extracting info: {e}")
-                return []
+            return None
 
+        if remaining is not None:
+            # YoutubeDL only reads socket_timeout when it is created,
+            # a pooled instance can not be limited by the deadline
+            checkout = YTDLPool.single(youtube_dl.YoutubeDL(dict(ydl_opts, socket_timeout=remaining)))
+        else:
+            pool = YTDLPool.for_session(self.session,
+                                        lambda: youtube_dl.YoutubeDL(ydl_opts),
+                                        size=2 if pool_size is None else pool_size)
+            checkout = pool.checkout()
+        with checkout as ydl:
+            try:
+                return ydl.extract_info(self.url, download=False)
+            except Exception as e:
+                log.error(f"Error extracting info: {e}")
+                return None
+
+    def ytdl_fallback(self):
+        '''Basic support for m3u8 URLs with youtube-dl'''
+        cache = self._ytdl_cache()
+        cached = cache.get(self.url) if cache else None
+        if cached:
+            log.debug('Cached youtube-dl info')
+            info = cached['value']
+        else:
+            info = self._ytdl_extract_info()
             if not info:
                 return []
-
-            self.title = info.get('title', 'Unknown Title')
-            streams_list = []
-            resolution_list_v_a = []
-            resolution_list_v_only = []
-            audio_streams = {fmt['format_id']: fmt for fmt in info.get('formats', []) if fmt.get('acodec', 'none') != 'none'}
-
-            if info.get('formats', None):
-                for fmt in info.get('formats', []):
-
-                    if 'vcodec' in fmt and fmt.get('vcodec', 'none') != 'none' and 'acodec' in fmt and fmt.get('acodec', 'none') != 'none':
-                        resolution_name = f"{fmt.get('height', 'unknown')}p"
-                        resolution_list_v_a.append(resolution_name)
-                        stream = HLSStream(self.session, fmt['url'], headers=fmt.get('http_headers')) if fmt.get('protocol') in ['m3u8', 'm3u8_native'] \
-                            else HTTPStream(self.session, fmt['url'], headers=fmt.get('http_headers'))
-                        streams_list.append((resolution_name, stream))
-                    
-                    if 'vcodec' in fmt and fmt.get('vcodec', 'none') != 'none' and (('acodec' not in fmt) or (fmt.get('acodec', 'none') == 'none')):
-                        resolution_name = f"{fmt.get('height', 'unknown')}p"
-                        if resolution_name not in resolution_list_v_a:
-                            resolution_list_v_only.append(resolution_name)
-                            stream = HLSStream(self.session, fmt['url'], headers=fmt.get('http_headers')) if fmt.get('protocol') in ['m3u8', 'm3u8_native'] \
-                                else HTTPStream(self.session, fmt['url'], headers=fmt.get('http_headers'))
-                            audio_fmt = next((audio_streams.get(fid) for fid in ['140', '139', '599', '234', '233'] if fid in audio_streams), None)
-                            if audio_fmt:
-                                audio_url = audio_fmt['url']
-                                audio_stream = HTTPStream(self.session, audio_url, headers=audio_fmt.get('http_headers')) if audio_fmt.get('protocol') not in ['m3u8', 'm3u8_native'] \
-                                        else HLSStream(self.session, audio_url, headers=audio_fmt.get('http_headers'))
-                                muxed_stream = MuxedStream(self.session,
-                                                    stream,
-                                                    audio_stream)
-                                streams_list.append((resolution_name, muxed_stream))
-
-                    if 'acodec' in fmt and fmt.get('acodec', 'none') != 'none' and ('vcodec' not in fmt or fmt.get('vcodec', 'none') == 'none'):
-                        audio_format = fmt.get('ext', 'unknown')
-                        audio_name = f"audio_{audio_format}"
-                        audio = HTTPStream(self.session, fmt['url'], headers=fmt.get('http_headers')) if fmt.get('protocol') not in ['m3u8', 'm3u8_native'] \
-                           else HLSStream(self.session, audio_url, headers=audio_fmt.get('http_headers'))
-                        streams_list.append((audio_name, audio))
-
-            if not info.get('formats', None) and info.get('requested_formats', None):
-                for fmt in info.get('requested_formats', []):
-
-                    if 'manifest_url' in fmt and fmt['manifest_url'].endswith('.m3u8'):
-                        try:
-                            hls_streams = HLSStream.parse_variant_playlist(self.session, fmt['manifest_url']).items()
-                            for quality, hls_stream in hls_streams:
-                                log.debug(f"{hls_stream.to_manifest_url}")
-                                resolution_name_hls = f"{quality}"
-                                streams_list.append((resolution_name_hls, hls_stream))
-                        except Exception as e:
-                            log.error(f"Error parsing HLS playlist: {e}")
-
-                    elif 'manifest_url' in fmt and fmt['manifest_url'].endswith('.mpd'):
-                        try:
-                            dash_streams = DASHStream.parse_manifest(self.session, fmt['manifest_url']).items()
-                            for quality, dash_stream in dash_streams:
-                                resolution_name_dash = f"{quality}p"
-                                streams_list.append((resolution_name_dash, dash_stream))
-                        except Exception as e:
-                            log.error(f"Error parsing DASH manifest: {e}")
-                            
-            log.debug(f"Saved streams: {streams_list}")
-
-            return streams_list
+            info = ytdl_info_slim(info)
+            if cache:
+                # not the Cache-Control of the website, see _resolve_cache_ttl
+                ttl = self.get_option('resolve_cache_ttl')
+                ttl = ytdl_info_ttl(info, 3600 if ttl is None else ttl)
+                if ttl:
+                    cache.set(self.url, info, ttl)
+
+        self.title = info.get('title', 'Unknown Title')
+        index = YTDLFormatIndex(self.session, info)
+        log.debug(f"Saved streams: {index.names}")
+        return index
 
     def _get_streams(self):
-        if HAS_YTDL:
-            ___streams = self.ytdl_fallback()
-            if ___streams and len(___streams) >= 1:
+        if self.context.full:
+            log.error('Too many iframe URLs: {0}'.format(len(self.context)))
+            raise NoStreamsError(self.url)
+        # --generic-trace-memory, for the whole resolve
+        trace_memory = self._run == 1 and self.get_option('trace_memory')
+        started = self._trace_memory() if trace_memory else None
+        # --generic-regex-profile, only for this resolve
+        regex_profile = self._run == 1 and self.get_option('regex_profile')
+        profile = REGEX.profile
+        if regex_profile:
+            REGEX.reset()
+            REGEX.profile = True
+
+        def resolve_end():
+            if regex_profile:
+                REGEX.profile = profile
+                self._log_regex_stats()
+            if trace_memory:
+                self._log_memory(started)
+
+        try:
+            with self.context.activate():
+                streams = self._get_chain_streams()
+        except BaseException:
+            resolve_end()
+            raise
+        if not (trace_memory or regex_profile) or streams is None:
+            resolve_end()
+            return streams
+        # the playlists are resolved while the streams are iterated
+        return self._resolve_end_after(streams, resolve_end)
+
+    @staticmethod
+    def _resolve_end_after(streams, resolve_end):
+        '''the streams, resolve_end is called after the last one'''
+        try:
+            yield from (streams.items() if isinstance(streams, dict) else streams)
+        finally:
+            resolve_end()
+
+    def _get_chain_streams(self):
+        use_ytdl = HAS_YTDL and not self.get_option('ytdl-disable')
+        ytdl_order = self.get_option('ytdl_order') or 'first'
+        if use_ytdl:
+            if ytdl_order == 'first' or self.get_option('ytdl-only'):
+                ___streams = self._ytdl_streams()
+                if ___streams:
+                    return (s for s in ___streams)
+                if self.get_option('ytdl-only'):
+                    return
+            elif ytdl_order == 'race':
+                streams = self._ytdl_race()
+                if streams is None:
+                    raise NoPluginError
+                return (s for s in streams)
+
+        try:
+            streams = self._get_website_streams()
+        except NoStreamsError:
+            # 403, 404 or the deadline, youtube-dl can still have streams
+            if not use_ytdl:
+                raise
+            ___streams = self._ytdl_streams()
+            if ___streams:
                 return (s for s in ___streams)
-            if self.get_option('ytdl-only'):
-                return
+            raise
+        if streams is not None:
+            return streams
+
+        if use_ytdl and not self.get_option('ytdl-only'):
+            ___streams = self._ytdl_streams()
+            if ___streams:
+                return (s for s in ___streams)
+
+        raise NoPluginError
+
+    def _is_generic_url(self, url):
+        try:
+            return self.session.resolve_url(url)[1] is type(self)
+        except NoPluginError:
+            return False
 
+    def _get_website_streams(self):
+        '''streams of the website, None if there are no streams'''
         if self._run <= 1:
             log.info('Version {0} - https://github.com/back-to/generic'.format(GENERIC_VERSION))
 
-        new_url = False
         log.info('  {0}. URL={1}'.format(self._run, self.url))
 
-        # GET website content
-        self.html_text = self._res_text(self.url)
-        # unpack common javascript codes
-        self.html_text = unpack(self.html_text)
+        candidates, playlist_list = self._get_website()
+        if not self._resolve_cache_hit:
+            return self._candidate_streams(candidates, playlist_list)
 
-        if self.get_option('debug'):
-            _valid_filepath = re.sub(r'(?u)[^-\w.]', '', str(self.url).strip().replace(' ', '_'))
-            _new_file = os.path.join(Path().absolute(),
-                                     f'{self._run}_{_valid_filepath}.html')
-            log.warning(f'NEW DEBUG FILE! {_new_file}')
-            try:
-                with open(_new_file, 'w+') as f:
-                    f.write(str(self.html_text))
-            except OSError:
-                pass
+        # the cached URLs can be outdated, a rotated token or a removed iframe
+        try:
+            streams = self._candidate_streams(candidates, playlist_list)
+            streams = streams and list(streams.items() if isinstance(streams, dict) else streams)
+        except (NoPluginError, NoStreamsError):
+            streams = None
+        if streams:
+            return streams
+        log.debug('No streams of the resolve cache, resolve again: {0}'.format(self.url))
+        self._resolve_cache().delete(self.url)
+        candidates, playlist_list = self._get_website(use_cache=False)
+        return self._candidate_streams(candidates, playlist_list)
+
+    def _candidate_streams(self, candidates, playlist_list):
+        '''streams of the candidates of _get_website, None if there are no streams'''
+        new_url = False
+        if playlist_list:
+            log.info('Found Playlists: {0} (valid)'.format(
+                len(playlist_list)))
+            return self._resolve_playlist(playlist_list)
 
         # Playlist URL
-        playlist_all = self._playlist_re.findall(self.html_text)
+        playlist_all = candidates['playlist']
         if playlist_all:
             log.debug('Found Playlists: {0}'.format(len(playlist_all)))
             playlist_list = self._make_url_list(playlist_all,
@@ -843,7 +2984,7 @@ class Generic(Plugin):
             log.trace('No Playlists')
 
         # iFrame URL
-        iframe_list = self._iframe_re.findall(self.html_text)
+        iframe_list = candidates['iframe']
         if iframe_list:
             log.debug('Found Iframes: {0}'.format(len(iframe_list)))
             # repair and filter iframe url list
@@ -878,20 +3019,40 @@ class Generic(Plugin):
 
         if not new_url:
             # search for window.location.href
-            new_url = self._window_location()
+            new_url = self._window_location(candidates['window_location'])
 
         if new_url:
+            self._check_deadline()
+            self._log_connection_stats()
             # the Dailymotion Plugin does not work with this Referer
-            if 'dailymotion.com' in new_url:
-                del self.session.http.headers['Referer']
+            if 'dailymotion.com' not in new_url and not self._is_generic_url(new_url):
+                return self._referer_streams(new_url)
             return self.session.streams(new_url)
 
-        if HAS_YTDL and not self.get_option('ytdl-disable') and not self.get_option('ytdl-only'):
-            ___streams = self.ytdl_fallback()
-            if ___streams and len(___streams) >= 1:
-                return (s for s in ___streams)
+        return None
 
-        raise NoPluginError
+    def _referer_streams(self, url):
+        '''streams of another plugin with this URL as Referer
+
+           other plugins only use the session headers, the Referer is only
+           set while the plugin resolves its streams, the streams send it
+           with their own request headers
+        '''
+        headers = self.session.http.headers
+        previous = headers.get('Referer')
+        headers['Referer'] = self.url
+        try:
+            streams = self.session.streams(url)
+        finally:
+            if previous is None:
+                headers.pop('Referer', None)
+            else:
+                headers['Referer'] = previous
+        for stream in streams.values():
+            args = getattr(stream, 'args', None)
+            if isinstance(args, dict):
+                args['headers'] = dict({'Referer': self.url}, **(args.get('headers') or {}))
+        return streams
 
 
 __plugin__ = Generic
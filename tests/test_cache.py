@@ -0,0 +1,147 @@
+import os.path
+import sys
+import tempfile
+import time
+import unittest
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic, GenericCache, PersistentCache, cache_control_ttl  # noqa
+
+
+class TestCacheControlTTL(unittest.TestCase):
+
+    def test_cache_control_ttl(self):
+        test_list = [
+            ({}, 3600),
+            ({'Cache-Control': 'public, max-age=60'}, 60),
+            ({'Cache-Control': 'max-age=7200'}, 3600),
+            ({'Cache-Control': 'max-age=invalid'}, 3600),
+            ({'Cache-Control': 'no-cache'}, 0),
+            ({'Cache-Control': 'private, no-store'}, None),
+        ]
+        for headers, ttl in test_list:
+            self.assertEqual(cache_control_ttl(headers, 3600), ttl, headers)
+
+
+class TestPersistentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache = PersistentCache(os.path.join(self.tempdir.name, 'cache.sqlite'), 'test', size=2)
+
+    def tearDown(self):
+        self.cache._db.close()
+        self.tempdir.cleanup()
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', {'playlist': ['b']}, 60, etag='"1"')
+        entry = self.cache.get('a')
+        self.assertEqual(entry['value'], {'playlist': ['b']})
+        self.assertEqual(entry['etag'], '"1"')
+        self.assertIsNone(entry['last_modified'])
+
+    def test_expired(self):
+        self.cache.set('a', 1, 0)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('a', stale=True)['value'], 1)
+
+    def test_delete(self):
+        self.cache.set('a', 1, 60)
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a', stale=True))
+        self.cache.delete('a')
+
+    def test_lru(self):
+        self.cache.set('a', 1, 60)
+        time.sleep(0.01)
+        self.cache.set('b', 2, 60)
+        time.sleep(0.01)
+        self.cache.get('a')
+        time.sleep(0.01)
+        self.cache.set('c', 3, 60)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a')['value'], 1)
+        self.assertEqual(self.cache.get('c')['value'], 3)
+
+
+class TestResolveCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        GenericCache.resolve_cache = PersistentCache(os.path.join(self.tempdir.name, 'cache.sqlite'), 'resolve')
+        self.session = Streamlink()
+
+    def tearDown(self):
+        GenericCache.resolve_cache._db.close()
+        del GenericCache.resolve_cache
+        self.tempdir.cleanup()
+
+    def test_resolve_cache(self):
+        url = 'http://mocked/resolve/cache'
+        website_text = '<html><title>Cached</title><video src="http://mocked/resolve/playlist.m3u8"></video></html>'
+        options = Options({'resolve-cache': True, 'ignore_same_url': True})
+        with requests_mock.Mocker() as mock:
+            mock.get(url, text=website_text)
+            mock.get('http://mocked/resolve/playlist.m3u8', text='#EXTM3U\n')
+            plugin = Generic(self.session, url, options)
+            self.assertIn('live', dict(plugin._get_streams()))
+            self.assertEqual(mock.request_history[0].url, url)
+
+            mock.reset_mock()
+            plugin = Generic(self.session, url, options)
+            self.assertIn('live', dict(plugin._get_streams()))
+            self.assertNotIn(url, [request.url for request in mock.request_history])
+            self.assertEqual(plugin.title, 'Cached')
+
+    def test_resolve_cache_outdated(self):
+        # the token of the cached playlist URL was rotated
+        url = 'http://mocked/resolve/token'
+        website_text = '<html><video src="http://mocked/resolve/live.m3u8?token={0}"></video></html>'
+        options = Options({'resolve-cache': True, 'ignore_same_url': True})
+        with requests_mock.Mocker() as mock:
+            mock.get(url, text=website_text.format(1))
+            mock.get('http://mocked/resolve/live.m3u8?token=1', text='#EXTM3U\n')
+            plugin = Generic(self.session, url, options)
+            self.assertIn('live', dict(plugin._get_streams()))
+
+            mock.get(url, text=website_text.format(2))
+            mock.get('http://mocked/resolve/live.m3u8?token=1', status_code=403)
+            mock.get('http://mocked/resolve/live.m3u8?token=2', text='#EXTM3U\n')
+            mock.reset_mock()
+            plugin = Generic(self.session, url, options)
+            self.assertEqual(list(plugin._get_streams())[0][1].url, 'http://mocked/resolve/live.m3u8?token=2')
+            self.assertIn(url, [request.url for request in mock.request_history])
+            self.assertEqual(GenericCache.resolve_cache.get(url)['value']['playlist'],
+                             ['http://mocked/resolve/live.m3u8?token=2'])
+
+    def test_resolve_cache_revalidate(self):
+        url = 'http://mocked/resolve/revalidate'
+        website_text = '<html><video src="http://mocked/resolve/{0}.m3u8"></video></html>'
+        options = Options({'resolve-cache': True, 'resolve-cache-ttl': 0, 'ignore_same_url': True})
+        with requests_mock.Mocker() as mock:
+            mock.get('http://mocked/resolve/1.m3u8', text='#EXTM3U\n')
+            mock.get('http://mocked/resolve/2.m3u8', text='#EXTM3U\n')
+            mock.get(url, text=website_text.format(1), headers={'ETag': '"1"'})
+            plugin = Generic(self.session, url, options)
+            self.assertEqual(list(plugin._get_streams())[0][1].url, 'http://mocked/resolve/1.m3u8')
+
+            # not modified
+            mock.get(url, status_code=304, headers={'ETag': '"1"'})
+            plugin = Generic(self.session, url, options)
+            self.assertEqual(list(plugin._get_streams())[0][1].url, 'http://mocked/resolve/1.m3u8')
+            requests = [request for request in mock.request_history if request.url == url]
+            self.assertEqual(requests[-1].headers['If-None-Match'], '"1"')
+            # the website is not cached
+            self.assertNotIn('html', GenericCache.resolve_cache.get(url, stale=True)['value'])
+
+            # modified
+            mock.get(url, text=website_text.format(2), headers={'ETag': '"2"'})
+            plugin = Generic(self.session, url, options)
+            self.assertEqual(list(plugin._get_streams())[0][1].url, 'http://mocked/resolve/2.m3u8')
+            self.assertEqual(GenericCache.resolve_cache.get(url, stale=True)['etag'], '"2"')
@@ -0,0 +1,109 @@
+import os.path
+import re
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.options import Options
+from streamlink.plugin import HIGH_PRIORITY, Plugin, pluginmatcher
+from streamlink.stream.http import HTTPStream
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic  # noqa
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'<html></html>'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pluginmatcher(re.compile(r'https?://other\.test/'), priority=HIGH_PRIORITY)
+class OtherPlugin(Plugin):
+    '''a plugin which only uses the session headers'''
+    referers = []
+
+    def _get_streams(self):
+        self.referers.append(self.session.http.headers.get('Referer'))
+        return {'live': HTTPStream(self.session, 'http://other.test/live.mp4')}
+
+
+class TestConnections(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+
+    def generic(self, url='http://mocked/page', **options):
+        return Generic(self.session, url, Options(options))
+
+    def test_referer_per_request(self):
+        plugin = self.generic()
+        with plugin.context.activate():
+            iframe = self.generic('http://mocked/iframe')
+        with requests_mock.Mocker() as mock:
+            mock.get('http://mocked/iframe', text='')
+            iframe._res_get('http://mocked/iframe')
+            self.assertEqual(mock.last_request.headers['Referer'], 'http://mocked/page')
+            plugin._res_get('http://mocked/iframe', headers={'Referer': 'http://other/'})
+            self.assertEqual(mock.last_request.headers['Referer'], 'http://other/')
+        self.assertNotIn('Referer', self.session.http.headers)
+
+    def test_referer_other_plugin(self):
+        # the session Referer is only set while the other plugin resolves
+        self.session.plugins['other'] = OtherPlugin
+        OtherPlugin.referers = []
+        plugin = self.generic()
+        streams = plugin._referer_streams('http://other.test/embed')
+        self.assertEqual(OtherPlugin.referers, ['http://mocked/page'])
+        self.assertEqual(streams['live'].args['headers'], {'Referer': 'http://mocked/page'})
+        self.assertNotIn('Referer', self.session.http.headers)
+
+        self.session.http.headers['Referer'] = 'http://mocked/session'
+        plugin._referer_streams('http://other.test/embed')
+        self.assertEqual(self.session.http.headers['Referer'], 'http://mocked/session')
+
+    def test_playlist_headers(self):
+        plugin = self.generic(**{'playlist-referer': 'http://mocked/referer'})
+        playlist_list = ['http://mocked/video_720.mp4', 'http://abc.cloudfront.net/video_480.mp4']
+        streams = dict(plugin._resolve_playlist(playlist_list))
+        self.assertEqual(streams['720p'].args['headers'], {'Referer': 'http://mocked/referer'})
+        self.assertEqual(streams['480p'].args['headers'],
+                         {'Referer': 'http://mocked/referer', 'Origin': 'http://mocked'})
+        self.assertNotIn('Referer', self.session.http.headers)
+
+    def test_pool_setup(self):
+        self.generic(**{'pool-maxsize': 20})
+        adapter = self.session.http.adapters['https://']
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertEqual(adapter._pool_connections, 10)
+        self.assertEqual(adapter.poolmanager.connection_pool_kw['maxsize'], 20)
+
+    def test_connection_stats(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:{0}/'.format(server.server_address[1])
+
+        plugin = self.generic(url)
+        for _ in range(3):
+            plugin._res_get(url)
+        with plugin.context.activate():
+            iframe = self.generic(url + 'iframe')
+        iframe._res_get(url + 'iframe')
+
+        stats = iframe._connection_stats()
+        self.assertEqual(stats['requests'] - plugin.context.connection_stats['requests'], 4)
+        self.assertEqual(stats['connections'] - plugin.context.connection_stats['connections'], 1)
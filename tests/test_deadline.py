@@ -0,0 +1,73 @@
+import os.path
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.exceptions import NoStreamsError
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic  # noqa
+
+
+class TestDeadline(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def generic(self, url='http://mocked/deadline', **options):
+        return Generic(self.session, url, Options(options))
+
+    def test_deadline_option(self):
+        plugin = self.generic(**{'resolve-timeout': 10})
+        self.assertTrue(9 < plugin._remaining() <= 10)
+        self.assertTrue(plugin._check_deadline() <= 10)
+        # the iframe url uses the deadline of the first url
+        with plugin.context.activate():
+            self.assertTrue(9 < self.generic('http://mocked/iframe')._remaining() <= 10)
+
+    def test_deadline_none(self):
+        plugin = self.generic()
+        self.assertIsNone(plugin._remaining())
+        self.assertIsNone(plugin._check_deadline())
+
+    def test_deadline_exhausted(self):
+        plugin = self.generic(**{'resolve-timeout': 10})
+        plugin.context.deadline = time.monotonic() - 1
+        with self.assertRaises(NoStreamsError):
+            plugin._check_deadline()
+        with requests_mock.Mocker() as mock:
+            mock.get('http://mocked/deadline', text='')
+            with self.assertRaises(NoStreamsError):
+                plugin._res_get('http://mocked/deadline')
+            self.assertFalse(mock.called)
+
+    def test_deadline_request_timeout(self):
+        plugin = self.generic(**{'resolve-timeout': 5})
+        with patch.object(self.session.http, 'get') as get:
+            plugin._res_get('http://mocked/deadline')
+            self.assertTrue(0 < get.call_args[1]['timeout'] <= 5)
+
+    def test_deadline_resolve_playlist(self):
+        def _playlist_streams(url, playlist_type, **kwargs):
+            height = url.split('/')[3]
+            if height == '480':
+                self.release.wait(5)
+            return [('{0}p'.format(height), None)]
+
+        playlist_list = ['http://mocked/{0}/playlist.m3u8'.format(i) for i in (720, 480, 360)]
+        plugin = self.generic(**{'resolve-timeout': 0.3})
+        with patch.object(Generic, '_playlist_streams', side_effect=_playlist_streams):
+            start = time.monotonic()
+            streams = [name for name, stream in plugin._resolve_playlist(playlist_list)]
+        self.assertEqual(streams, ['720p'])
+        self.assertLess(time.monotonic() - start, 2)
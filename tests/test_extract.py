@@ -0,0 +1,72 @@
+import os.path
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic, PageExtract  # noqa
+from .test_scanner import corpus, regex_matches  # noqa
+
+og_title_re = re.compile(r'<meta\s*property="og:title"\s*content="(?P<title>[^<>]+)"\s*/?>')
+title_re = re.compile(r'<title[^<>]*>(?P<title>[^<>]+)</title>')
+
+
+def regex_first(regex, text, group):
+    m = regex.search(text)
+    return (m.group(group), m.start(group), m.end()) if m else None
+
+
+class TestPageExtract(unittest.TestCase):
+
+    def assertExtract(self, text):
+        page = PageExtract(text)
+        self.assertEqual(page.playlist, regex_matches(Generic._playlist_re, text), text)
+        self.assertEqual(page.iframe, regex_matches(Generic._iframe_re, text), text)
+        self.assertEqual(page.window_location, regex_first(Generic._window_location_re, text, 'url'), text)
+        self.assertEqual(page.og_title, regex_first(og_title_re, text, 'title'), text)
+        self.assertEqual(page.title, regex_first(title_re, text, 'title'), text)
+
+    def test_corpus(self):
+        texts = list(corpus('test_playlist_re', 'test_playlist_re_false', 'test_iframe_re',
+                            'test_iframe_re_false', 'test_window_location_re'))
+        self.assertGreater(len(texts), 30)
+        for text in texts:
+            self.assertExtract(text)
+
+    def test_page(self):
+        text = '''
+<html><head>
+<title>Not
+  the title</title>
+<meta property="og:title" content="Live &amp; more" />
+<meta property="og:title" content="second" />
+</head><body>
+<iframe src="https://example.com/embed"></iframe>
+<video src="https://example.com/live.m3u8"></video>
+<script>
+window.location.href = 'https://example.com/redirect';
+</script>
+<iframe src="https://example.com/embed2"></iframe>
+</body></html>
+'''
+        self.assertExtract(text)
+        page = PageExtract(text)
+        self.assertEqual(page.urls('playlist'), ['https://example.com/live.m3u8'])
+        self.assertEqual(page.urls('iframe'), ['https://example.com/embed', 'https://example.com/embed2'])
+        self.assertEqual(page.window_location[0], 'https://example.com/redirect')
+        self.assertEqual(page.og_title[0], 'Live &amp; more')
+        self.assertEqual(page.title[0], 'Not\n  the title')
+
+    def test_random(self):
+        alphabet = ['"', "'", '=', '&quot;', '.', 'm3u8', 'mp4', '?', '/', ' ', ';', '>', '<', 'a', 'title=',
+                    '<iframe', ' src=', '<script>', 'window.location.href = ', '<title>', '</title>',
+                    '<meta property="og:title" content=', '/>', '\n']
+        rand = random.Random(0)
+        for _ in range(3000):
+            self.assertExtract(''.join(rand.choice(alphabet) for _ in range(rand.randint(0, 60))))
+
+    def test_linear(self):
+        text = '=a.mp4?b;<iframe src="x" <title>' * 20000
+        page = PageExtract(text)
+        self.assertEqual((page.playlist, page.iframe, page.title), ([], [], None))
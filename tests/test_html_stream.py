@@ -0,0 +1,59 @@
+import os.path
+import sys
+import unittest
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic  # noqa
+
+
+class TestHTMLStream(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+
+    def get_plugin(self, url, **options):
+        plugin = Generic(self.session, url, Options(options))
+        plugin.html_stream_chunk_size = 64
+        plugin.html_stream_overlap = 48
+        return plugin
+
+    def test_res_text_stream_early(self):
+        website_text = '<html>{0}</html>'.format(''.join(
+            '<video src="http://mocked/{0}/playlist.m3u8"></video>'.format(i) for i in range(100)))
+        with requests_mock.Mocker() as mock:
+            mock.get('http://mocked/stream/early', text=website_text)
+            plugin = self.get_plugin('http://mocked/stream/early', **{'playlist-max': 3})
+            html_text, playlist_list = plugin._res_text_stream(plugin.url)
+
+        self.assertEqual(playlist_list, [
+            'http://mocked/0/playlist.m3u8',
+            'http://mocked/1/playlist.m3u8',
+            'http://mocked/2/playlist.m3u8',
+        ])
+        self.assertTrue(website_text.startswith(html_text))
+        self.assertLess(len(html_text), len(website_text))
+
+    def test_res_text_stream_complete(self):
+        website_text = '<html><p>{0}</p><video src="http://mocked/split/playlist.m3u8"></video></html>'.format('a' * 100)
+        with requests_mock.Mocker() as mock:
+            mock.get('http://mocked/stream/complete', text=website_text)
+            plugin = self.get_plugin('http://mocked/stream/complete')
+            html_text, playlist_list = plugin._res_text_stream(plugin.url)
+
+        self.assertEqual(playlist_list, [])
+        self.assertEqual(html_text, website_text)
+
+    def test_res_text_stream_unicode(self):
+        website_text = '<html><p>{0}</p></html>'.format('ä€' * 100)
+        with requests_mock.Mocker() as mock:
+            mock.get('http://mocked/stream/unicode', content=website_text.encode('utf-8'),
+                     headers={'Content-Type': 'text/html; charset=utf-8'})
+            plugin = self.get_plugin('http://mocked/stream/unicode')
+            html_text, playlist_list = plugin._res_text_stream(plugin.url)
+
+        self.assertEqual(html_text, website_text)
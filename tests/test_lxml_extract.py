@@ -0,0 +1,84 @@
+import os.path
+import sys
+import unittest
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import HAS_LXML, Generic, LxmlPageExtract, PageExtract  # noqa
+
+page = '''<!DOCTYPE html>
+<html><head>
+<title>Live  Stream</title>
+<meta content="Live &amp; more" property="og:title">
+<meta property="og:image" content="https://example.com/image.jpg">
+</head><body>
+<iframe width="640"
+        src = "https://example.com/embed/1"
+        allowfullscreen></iframe>
+<iframe src=https://example.com/embed/2></iframe>
+<iframe src="https://example.com/embed/3" name="g_iFrame1"></iframe>
+<video controls><source type="application/x-mpegURL" src="https://example.com/live.m3u8"></video>
+<video src="https://example.com/poster.jpg"></video>
+<div data-src="https://example.com/data.m3u8"></div>
+<a href="https://example.com/link.mp4">download</a>
+<img alt="not a url.mp4" src="https://example.com/image.jpg">
+<script>
+var player = {file: "https://example.com/player.mpd"};
+document.write('<iframe src="https://example.com/script-embed"></iframe>');
+window.location.href = 'https://example.com/redirect';
+</script>
+</body></html>
+'''
+
+
+@unittest.skipUnless(HAS_LXML, 'lxml is not installed')
+class TestLxmlPageExtract(unittest.TestCase):
+
+    def test_page(self):
+        extract = LxmlPageExtract(page)
+        self.assertEqual(extract.urls('iframe'), ['https://example.com/embed/1', 'https://example.com/embed/2',
+                                                  'https://example.com/script-embed'])
+        self.assertEqual(extract.urls('playlist'), ['https://example.com/live.m3u8', 'https://example.com/data.m3u8',
+                                                    'https://example.com/link.mp4', 'https://example.com/player.mpd'])
+        self.assertEqual(extract.window_location[0], 'https://example.com/redirect')
+        self.assertEqual(extract.og_title[0], 'Live & more')
+        self.assertEqual(extract.og['og:image'], 'https://example.com/image.jpg')
+        self.assertEqual(extract.title[0], 'Live  Stream')
+
+    def test_recall(self):
+        # spaces around = and unquoted src are missed by the regex scan
+        self.assertEqual(PageExtract(page).urls('iframe'),
+                         ['https://example.com/embed/3', 'https://example.com/script-embed'])
+        self.assertIsNone(PageExtract(page).og_title)
+
+    def test_unpacked_script(self):
+        # p.a.c.k.e.r code of test_unpack.py after unpack
+        text = '<html><body><script><iframe src="https://packed.com"></iframe></script></body></html>'
+        self.assertEqual(LxmlPageExtract(text).urls('iframe'), PageExtract(text).urls('iframe'))
+        self.assertEqual(LxmlPageExtract(text).urls('iframe'), ['https://packed.com'])
+
+    def test_invalid(self):
+        for text in ('', '  ', '<?xml version="1.0" encoding="utf-8"?><html></html>'):
+            with self.assertRaises(ValueError):
+                LxmlPageExtract(text)
+
+    def test_backend_option(self):
+        plugin = Generic(Streamlink(), 'https://example.com/', Options({'extract-backend': 'lxml'}))
+        plugin.html_text = page
+        self.assertIsInstance(plugin._page(), LxmlPageExtract)
+        self.assertEqual(plugin._candidates()['iframe'], ['https://example.com/embed/1', 'https://example.com/embed/2',
+                                                          'https://example.com/script-embed'])
+        self.assertEqual(plugin.get_title(), 'Live & more')
+
+        plugin.html_text = ''
+        self.assertIs(type(plugin._page()), PageExtract)
+
+    def test_title_entities(self):
+        # the entities are only decoded once
+        text = '<html><head><title>a &amp;lt; b</title></head></html>'
+        for backend in ('regex', 'lxml'):
+            plugin = Generic(Streamlink(), 'https://example.com/', Options({'extract-backend': backend}))
+            plugin.html_text = text
+            self.assertEqual(plugin.get_title(), 'a &lt; b', backend)
@@ -0,0 +1,88 @@
+import os.path
+import sys
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic  # noqa
+
+url = 'http://mocked/memory'
+website_text = '<html>\n' + 'äöü € text\n' * 500 + '"http://mocked/memory/live.m3u8"\n</html>'
+website_bytes = website_text.encode('utf-8')
+
+
+class TestMaxDocumentSize(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+
+    def generic(self, **options):
+        plugin = Generic(self.session, url, Options(options))
+        # many chunks, which split the multibyte chars
+        plugin.html_stream_chunk_size = 7
+        return plugin
+
+    def test_unlimited(self):
+        with requests_mock.Mocker() as mock:
+            mock.get(url, content=website_bytes, headers={'Content-Type': 'text/html; charset=utf-8'})
+            self.assertEqual(self.generic()._res_text(url), website_text)
+            self.assertEqual(self.generic(**{'max-document-size': 10 ** 6})._res_text(url), website_text)
+
+    def test_max_document_size(self):
+        for max_size in (1, 100, 101, 1000):
+            with requests_mock.Mocker() as mock:
+                mock.get(url, content=website_bytes, headers={'Content-Type': 'text/html; charset=utf-8'})
+                text = self.generic(**{'max-document-size': max_size})._res_text(url)
+            self.assertEqual(text, website_bytes[:max_size].decode('utf-8', errors='ignore'), max_size)
+
+    def test_html_stream(self):
+        with requests_mock.Mocker() as mock:
+            mock.get(url, content=website_bytes, headers={'Content-Type': 'text/html; charset=utf-8'})
+            text, playlist_list = self.generic(**{'max-document-size': 1000})._res_text_stream(url)
+            self.assertEqual(text, website_bytes[:1000].decode('utf-8', errors='ignore'))
+            self.assertEqual(playlist_list, [])
+
+            text, playlist_list = self.generic()._res_text_stream(url)
+            self.assertEqual(text, website_text)
+            # the whole website was read, the playlist list is not used
+            self.assertEqual(playlist_list, [])
+
+
+class TestTraceMemory(unittest.TestCase):
+
+    def test_trace_memory(self):
+        plugin = Generic(Streamlink(), url, Options({'trace-memory': True}))
+        with patch.object(Generic, '_get_chain_streams', return_value={}), \
+                self.assertLogs('plugins.generic', level='DEBUG') as logs:
+            self.assertEqual(list(plugin._get_streams()), [])
+        self.assertTrue(any('Memory:' in line and 'MiB peak' in line for line in logs.output))
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_trace_memory_playlists(self):
+        # the playlists of the lazy streams are measured
+        def playlist_streams():
+            data = bytearray(8 * 1024 * 1024)
+            yield 'live', len(data)
+
+        plugin = Generic(Streamlink(), url, Options({'trace-memory': True}))
+        with patch.object(Generic, '_get_chain_streams', return_value=playlist_streams()), \
+                patch.object(Generic, '_log_memory', wraps=plugin._log_memory) as log_memory:
+            streams = plugin._get_streams()
+            self.assertTrue(tracemalloc.is_tracing())
+            log_memory.assert_not_called()
+            self.assertEqual(list(streams), [('live', 8 * 1024 * 1024)])
+            self.assertEqual(log_memory.call_count, 1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_trace_memory_disabled(self):
+        plugin = Generic(Streamlink(), url, Options())
+        with patch.object(Generic, '_trace_memory') as trace_memory:
+            with patch.object(Generic, '_get_chain_streams', return_value={}):
+                self.assertEqual(plugin._get_streams(), {})
+        trace_memory.assert_not_called()
@@ -3,7 +3,7 @@ import sys
 import unittest
 
 sys.path.insert(0, os.path.abspath('..'))
-from plugins.generic import UnpackingError, Packer, unpack_packer  # noqa
+from plugins.generic import UnpackingError, Packer, Unbaser, unpack_packer  # noqa
 
 
 class TestPacker(unittest.TestCase):
@@ -125,3 +125,26 @@ eval(function(p,a,c,k,e,r){e=String;if(!''.replace(/^/,String)){while(c--)r[c]=k
 <iframe src="https://example4.com"></iframe>
 </html>
 """)
+
+    def test_replacestrings(self):
+        self.assertEqual(
+            self.my_unpacker._replacestrings('var _0x1=["a","b","c"];f(_0x1[0],_0x1[2]);g(_0x1[01],_0x1[3])'),
+            'f("a","c");g(_0x1[01],_0x1[3])')
+
+    def test_wordmap(self):
+        self.assertEqual(self.my_unpacker._wordmap(['a', '', 'c'], 1), {'0': 'a', '1': '1', '2': 'c'})
+        symtab = ['sym%d' % i for i in range(200)]
+        for radix in (10, 36, 40, 62):
+            unbase = Unbaser(radix)
+            for word, symbol in self.my_unpacker._wordmap(symtab, radix).items():
+                self.assertEqual(symtab[unbase(word)], symbol)
+
+    def test_unbaser(self):
+        for base, word, number in ((10, '123', 123), (36, 'zz', 1295), (40, 'Dz', 1595),
+                                   (62, 'Zz', 3817), (95, '!~', 189)):
+            self.assertEqual(Unbaser(base)(word), number)
+        self.assertIs(Unbaser.table(62), Unbaser(62).dictionary)
+
+    def test_unbaser_error(self):
+        with self.assertRaises(TypeError):
+            Unbaser(70)
@@ -0,0 +1,84 @@
+import os.path
+import re
+import sys
+import unittest
+from unittest.mock import patch
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import REGEX, Generic, RegexRegistry, unpack  # noqa
+from .test_unpack import obfuscatorhtml_text, packer_text  # noqa
+
+
+class TestRegexRegistry(unittest.TestCase):
+
+    def test_pattern(self):
+        registry = RegexRegistry()
+        regex = registry.add('word', r'(?P<word>\w+)')
+        self.assertIs(registry['word'], regex)
+        self.assertIn('word', registry)
+        self.assertEqual(regex.pattern, r'(?P<word>\w+)')
+        self.assertEqual(regex.groupindex, {'word': 1})
+        self.assertEqual(regex.search('  ab cd').group('word'), 'ab')
+        self.assertIsNone(regex.match('  ab'))
+        self.assertEqual(regex.match('  ab', 2).group(0), 'ab')
+        self.assertEqual(regex.sub('-', 'ab cd'), '- -')
+        self.assertEqual([m.group(0) for m in regex.finditer('ab cd')], ['ab', 'cd'])
+        self.assertEqual(registry.stats, {})
+        with self.assertRaises(ValueError):
+            registry.add('word', r'\w')
+
+    def test_profile(self):
+        registry = RegexRegistry(profile=True)
+        regex = registry.add('word', r'\w+')
+        regex.search('ab')
+        regex.sub('', 'ab')
+        self.assertEqual([m.span() for m in regex.finditer('ab cd ef')],
+                         [m.span() for m in re.finditer(r'\w+', 'ab cd ef')])
+        self.assertEqual(registry.stats['word'][0], 3)
+        self.assertGreaterEqual(registry.stats['word'][1], 0)
+
+        registry.dynamic('index', r'a\[\d\]').search('a[1]')
+        registry.dynamic('index', r'b\[\d\]').search('b[1]')
+        self.assertIs(registry.dynamic('index', r'a\[\d\]'), registry.dynamic('index', r'a\[\d\]'))
+        self.assertEqual([(name, calls) for name, calls, seconds in registry.report()
+                          if name == 'index'], [('index', 2)])
+        registry.reset()
+        self.assertEqual(registry.report(), [])
+
+    def test_unpack(self):
+        # the unpackers use the registered patterns
+        REGEX.reset()
+        REGEX.profile = True
+        try:
+            text = packer_text % 'example'
+            self.assertEqual(unpack(text), '<iframe src="https://example.com"></iframe>')
+            self.assertEqual(unpack(obfuscatorhtml_text('<p>a</p>')), '<p>a</p>')
+        finally:
+            REGEX.profile = False
+        stats = REGEX.stats
+        self.assertEqual(stats['packer_word'][0], 1)
+        self.assertEqual(stats['packer_juicer_1'][0], 1)
+        self.assertEqual(stats['non_digit'][0], 8)
+        REGEX.reset()
+
+    def test_profile_option(self):
+        # only the resolve with --generic-regex-profile, the stats of other resolves are removed
+        REGEX.profile = False
+        REGEX.record('before', 1.0)
+
+        def chain_streams(plugin):
+            self.assertTrue(REGEX.profile)
+            REGEX['title'].search('<title>a</title>')
+            return {}
+
+        plugin = Generic(Streamlink(), 'http://mocked/regex', Options({'regex-profile': True}))
+        with patch.object(Generic, '_get_chain_streams', autospec=True, side_effect=chain_streams), \
+                self.assertLogs('plugins.generic', level='DEBUG') as logs:
+            self.assertEqual(list(plugin._get_streams()), [])
+        self.assertFalse(REGEX.profile)
+        self.assertEqual(list(REGEX.stats), ['title'])
+        self.assertTrue(any('Regex title: 1 calls' in line for line in logs.output))
+        REGEX.reset()
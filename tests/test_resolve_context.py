@@ -0,0 +1,85 @@
+import os.path
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+from streamlink import Streamlink
+from streamlink.options import Options
+from streamlink.stream import HTTPStream
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic, ResolveContext  # noqa
+
+
+class TestResolveContext(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+        self.session.plugins = {'generic': Generic}
+
+    def generic(self, url):
+        return Generic(self.session, url, Options())
+
+    def test_context(self):
+        context = ResolveContext()
+        self.assertEqual(context.add('http://mocked/1'), 'http://mocked/1')
+        self.assertEqual(context.add('http://mocked/2'), 'http://mocked/1')
+        self.assertEqual(context.add('http://mocked/3'), 'http://mocked/2')
+        self.assertIn('http://mocked/2', context)
+        self.assertNotIn('http://mocked/4', context)
+        self.assertEqual(len(context), 3)
+        self.assertIsNone(ResolveContext.current())
+        with context.activate():
+            self.assertIs(ResolveContext.current(), context)
+        self.assertIsNone(ResolveContext.current())
+
+    def test_chain(self):
+        plugins = []
+
+        def get_website_streams(plugin):
+            plugins.append(plugin)
+            if plugin.url == 'http://mocked/3':
+                return iter([('live', HTTPStream(plugin.session, plugin.url))])
+            return plugin.session.streams('http://mocked/{0}'.format(plugin._run + 1))
+
+        with patch.object(Generic, '_get_website_streams', autospec=True, side_effect=get_website_streams):
+            plugin = self.generic('http://mocked/1')
+            self.assertEqual(self.session.streams('http://mocked/1')['live'].url, 'http://mocked/3')
+        last = plugins[-1]
+        self.assertIsNot(plugin.context, last.context)
+        self.assertIs(plugins[0].context, last.context)
+        self.assertEqual(last.context.urls, ['http://mocked/1', 'http://mocked/2', 'http://mocked/3'])
+        self.assertEqual(last.referer, 'http://mocked/2')
+        self.assertEqual(last._run, 3)
+        # a new chain after the resolve
+        self.assertEqual(self.generic('http://mocked/1')._run, 1)
+
+    def test_chain_max_size(self):
+        def get_website_streams(plugin):
+            return plugin.session.streams('http://mocked/{0}'.format(plugin._run + 1))
+
+        plugin = self.generic('http://mocked/1')
+        with patch.object(Generic, '_get_website_streams', autospec=True, side_effect=get_website_streams):
+            self.assertEqual(plugin._get_streams(), {})
+        self.assertEqual(len(plugin.context), plugin.context.max_size + 1)
+
+    def test_threads(self):
+        barrier = threading.Barrier(2)
+        runs = {}
+
+        def get_website_streams(plugin):
+            runs[plugin.url] = (plugin._run, plugin.referer)
+            barrier.wait(5)
+            return iter([])
+
+        def resolve(url):
+            self.generic(url)._get_streams()
+
+        with patch.object(Generic, '_get_website_streams', autospec=True, side_effect=get_website_streams):
+            threads = [threading.Thread(target=resolve, args=('http://mocked/{0}'.format(i),)) for i in (1, 2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(runs, {'http://mocked/1': (1, 'http://mocked/1'), 'http://mocked/2': (1, 'http://mocked/2')})
@@ -0,0 +1,73 @@
+import os.path
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic  # noqa
+
+text_master_hls = """#EXTM3U
+#EXT-X-STREAM-INF:PROGRAM-ID=1,BANDWIDTH=1152000,RESOLUTION=1280x{0}
+index.m3u8
+"""
+
+
+class TestResolvePlaylist(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+        self.release = threading.Event()
+        self.playlist_list = ['http://mocked/{0}/playlist.m3u8'.format(i) for i in (720, 480, 360)]
+
+    def mock_playlists(self, mock):
+        for url in self.playlist_list:
+            mock.get(url, text=text_master_hls.format(url.split('/')[3]))
+
+    def playlist_streams(self, delay=None):
+        def _playlist_streams(url, playlist_type, **kwargs):
+            height = url.split('/')[3]
+            if height == delay:
+                self.release.wait(5)
+            return [('{0}p'.format(height), None)]
+        return patch.object(Generic, '_playlist_streams', side_effect=_playlist_streams)
+
+    def resolve_playlist(self, **options):
+        plugin = Generic(self.session, 'http://mocked/resolve', Options(options))
+        return [name for name, stream in plugin._resolve_playlist(self.playlist_list)]
+
+    def test_resolve_playlist(self):
+        with requests_mock.Mocker() as mock:
+            self.mock_playlists(mock)
+            self.assertEqual(self.resolve_playlist(), ['720p', '480p', '360p'])
+
+    def test_resolve_playlist_workers(self):
+        with self.playlist_streams(delay='720'):
+            threading.Timer(0.2, self.release.set).start()
+            self.assertEqual(self.resolve_playlist(**{'playlist-workers': 3}), ['720p', '480p', '360p'])
+
+    def test_resolve_playlist_workers_max(self):
+        with self.playlist_streams():
+            self.assertEqual(self.resolve_playlist(**{'playlist-workers': 3, 'playlist-max': 2}), ['720p', '480p'])
+
+    def test_resolve_playlist_workers_timeout(self):
+        with self.playlist_streams(delay='480'):
+            try:
+                self.assertEqual(self.resolve_playlist(**{'playlist-workers': 3, 'playlist-timeout': 0.2}), ['720p', '360p'])
+            finally:
+                self.release.set()
+
+    def test_resolve_playlist_origin(self):
+        self.playlist_list = ['http://abc.cloudfront.net/live.m3u8', 'http://mocked/live.m3u8']
+        with requests_mock.Mocker() as mock:
+            mock.get('http://abc.cloudfront.net/live.m3u8', text='#EXTM3U\n')
+            mock.get('http://mocked/live.m3u8', text='#EXTM3U\n')
+            self.resolve_playlist(**{'playlist-workers': 2})
+            history = dict((request.url, request.headers) for request in mock.request_history)
+            self.assertEqual(history['http://abc.cloudfront.net/live.m3u8']['Origin'], 'http://mocked')
+            self.assertNotIn('Origin', history['http://mocked/live.m3u8'])
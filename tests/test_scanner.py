@@ -0,0 +1,56 @@
+import ast
+import os.path
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic, scan_iframe, scan_playlist  # noqa
+
+
+def corpus(*function_names):
+    '''string constants of the regex tests in test_generic.py'''
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_generic.py')
+    with open(filename, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name in function_names:
+            for child in ast.walk(node):
+                if isinstance(child, ast.Constant) and isinstance(child.value, str):
+                    yield child.value
+
+
+def regex_matches(regex, text):
+    return [(m.group('url'), m.start('url'), m.end()) for m in regex.finditer(text)]
+
+
+class TestScanner(unittest.TestCase):
+
+    def test_playlist_corpus(self):
+        texts = list(corpus('test_playlist_re', 'test_playlist_re_false'))
+        self.assertGreater(len(texts), 20)
+        for text in texts:
+            self.assertEqual(list(scan_playlist(text)), regex_matches(Generic._playlist_re, text), text)
+
+    def test_iframe_corpus(self):
+        texts = list(corpus('test_iframe_re', 'test_iframe_re_false'))
+        self.assertGreater(len(texts), 10)
+        for text in texts:
+            self.assertEqual(list(scan_iframe(text)), regex_matches(Generic._iframe_re, text), text)
+
+    def test_random(self):
+        alphabet = ['"', "'", '=', '&quot;', '.', 'm3u8', 'mp4', 'mp3', 'mpd', '?', '/', '\\', ' ', ';',
+                    '>', '<', 'a', 'title=', '"title":', '{', '\n', '<iframe', '<IFR"+"ame', ' src=', 'SRC=',
+                    ' name="g_iframe', 'ame']
+        rand = random.Random(0)
+        for _ in range(5000):
+            text = ''.join(rand.choice(alphabet) for _ in range(rand.randint(0, 60)))
+            self.assertEqual(list(scan_playlist(text)), regex_matches(Generic._playlist_re, text), text)
+            self.assertEqual(list(scan_iframe(text)), regex_matches(Generic._iframe_re, text), text)
+
+    def test_linear(self):
+        # the regular expressions need several seconds for these texts
+        text = '=a.mp4?b;' * 20000
+        self.assertEqual(list(scan_playlist(text)), [])
+        text = '<iframe src="x" ' * 20000
+        self.assertEqual(list(scan_iframe(text)), [])
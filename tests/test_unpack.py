@@ -0,0 +1,124 @@
+import base64
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import (  # noqa
+    UNPACK_RULES,
+    Unpacker,
+    unpack,
+    unpack_obfuscatorhtml,
+    unpack_packer,
+    unpack_source_url,
+    unpack_source_url_re_1,
+    unpack_source_url_re_2,
+    unpack_source_url_re_3,
+    unpack_u_m3u8,
+    unpack_unescape,
+)
+
+packer_text = (
+    "eval(function(p,a,c,k,e,r){e=String;if(!''.replace(/^/,String)){while(c--)r[c]=k[c]||c;k=[function(e){return r[e]}];"
+    "e=function(){return'\\\\w+'};c=1};while(c--)if(k[c])p=p.replace(new RegExp('\\\\b'+e(c)+'\\\\b','g'),k[c]);return p}"
+    "('<0 1=\"2://3.4\"></0>',5,5,'iframe|src|https|%s|com'.split('|'),0,{}))"
+)
+# document.write(unescape("%41")), "41" is decoded with the empty symbol 249
+packer_unescape_text = (
+    "<script>eval(function(p,a,c,k,e,r){e=String;if(!''.replace(/^/,String)){while(c--)r[c]=k[c]||c;"
+    "k=[function(e){return r[e]}];e=function(){return'\\\\w+'};c=1};while(c--)if(k[c])p=p.replace("
+    "new RegExp('\\\\b'+e(c)+'\\\\b','g'),k[c]);return p}"
+    "('0.1(2(\"%41\"));',62,250,'document|write|unescape" + "|" * 247 + "'.split('|'),0,{}))</script>"
+)
+
+
+def obfuscatorhtml_text(text, minus=61247100):
+    chunks = ', '.join(
+        '"{0}"'.format(base64.b64encode('aNf{0}Bzh'.format(ord(c) + minus).encode()).decode())
+        for c in text
+    )
+    return '<script>var MLF = ""; var ncR = [{0}]; ncR.forEach(function (value) {{ MLF += String.fromCharCode(parseInt(' \
+           'atob(value).replace(/\\D/g,\'\')) - {1}); }} ); document.write(decodeURIComponent(escape(MLF)));</script>'.format(
+               chunks, minus)
+
+
+def unpack_sequential(text):
+    text = unpack_packer(text)
+    text = unpack_obfuscatorhtml(text)
+    text = unpack_unescape(text)
+    text = unpack_source_url(text, unpack_source_url_re_1)
+    text = unpack_source_url(text, unpack_source_url_re_2)
+    text = unpack_source_url(text, unpack_source_url_re_3)
+    text = unpack_u_m3u8(text)
+    return text
+
+
+class TestUnpack(unittest.TestCase):
+
+    test_list = [
+        '',
+        '<html><head><title>Title</title></head><body><p>no packed code</p></body></html>',
+        '<html>\n{0}\n<p>text</p>\n{1}\n</html>'.format(packer_text % 'example1', packer_text % 'example2'),
+        '<html>\n{0}\n</html>'.format(obfuscatorhtml_text('<iframe src="https://example.com/embed"></iframe>')),
+        """
+<html><body>
+<script>
+document.write(unescape("%3Cscript%3E%0Adocument.write%28unescape%28%22Test%2520Script%22%29%29%3B%0A%3C/script%3E"));
+</script>
+<script type="text/javascript">document.write(unescape('Test%201'));</script>
+</body></html>
+""",
+        """
+player.load({source: window.atob('aHR0cHM6Ly9leGFtcGxlLmNvbQ=='), mimeType: 'application/vnd.apple.mpegurl'});
+var xurl=atob('aHR0cHM6Ly9leGFtcGxlLmNvbQ==');
+var yurl=atob('xxx=');
+var player = new Clappr.Player({
+source: window.atob("aHR0cHM6Ly9leGFtcGxlLmNvbS8y"),
+""",
+        '{\\u0022file\\u0022:\\u0022https://example.com/live.m3u8\\u0022, \\u0022a\\u0022:1}'
+        ' {\\u0022file\\u0022:\\u0022https://example.com/2.m3u8?a=b\\u0022}',
+        # the unpacked code completes a match of an enclosing trigger
+        packer_unescape_text,
+        'var player = new Clappr.Player({{ {0} }});'.format(
+            obfuscatorhtml_text('source: window.atob("aHR0cHM6Ly9leGFtcGxlLmNvbS8y"),')),
+    ]
+
+    def test_unpack_sequential(self):
+        for text in self.test_list:
+            self.assertEqual(unpack(text), unpack_sequential(text))
+
+    def test_unpack_mixed(self):
+        text = '\n'.join(self.test_list)
+        self.assertEqual(unpack(text), unpack_sequential(text))
+
+    def test_unpack_enclosing(self):
+        self.assertEqual(unpack(packer_unescape_text), 'A')
+        self.assertEqual(unpack(self.test_list[-1]), 'var player = new Clappr.Player({ source: "https://example.com/2", });')
+
+    def test_unpack_nested(self):
+        text = obfuscatorhtml_text(packer_text % 'nested')
+        self.assertEqual(unpack(text), '<iframe src="https://nested.com"></iframe>')
+
+    def test_unpack_invalid_packer(self):
+        text = 'eval(function(p,a,c,k,e,r){e=String;if)'
+        self.assertEqual(unpack(text), text)
+
+    def test_unpack_gate(self):
+        unpacker = Unpacker(UNPACK_RULES)
+        text = '<html><script>var a = "b";</script></html>'
+        self.assertEqual(unpacker.gate(text), ())
+        self.assertEqual(unpacker.unpack(text), text)
+        self.assertEqual(unpacker.stats['unescape'], {'hit': 0, 'skip': 1})
+
+        text = packer_text % 'example'
+        self.assertEqual([rule.name for rule in unpacker.gate(text)], ['packer'])
+        self.assertEqual(unpacker.unpack(text), '<iframe src="https://example.com"></iframe>')
+        # once for every text of unpack, not for every pass
+        self.assertEqual(unpacker.stats['packer'], {'hit': 1, 'skip': 1})
+
+    def test_unpack_gate_triggers(self):
+        # without a replacement only the triggers of the gated rules are scanned
+        unpacker = Unpacker(UNPACK_RULES)
+        text = 'eval(function(p,a,c,k,e,r){e=String;if) <script>'
+        self.assertEqual(unpacker.unpack(text), text)
+        self.assertEqual([[rule.name for rule in rules] for rules in unpacker._scanners], [['packer']])
@@ -0,0 +1,136 @@
+import os.path
+import random
+import sys
+import unittest
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.abspath('..'))
+from plugins.generic import Generic, PrefixTrie, SuffixTrie, URLFilter, compile_url_filter  # noqa
+
+rules = dict(
+    whitelist_netloc=(),
+    whitelist_path=(),
+    blacklist_netloc_static=Generic.blacklist_netloc,
+    blacklist_netloc=('blocked.com', 'bad.example.org'),
+    blacklist_path=(('facebook.com', '/connect'), ('facebook.com', '/plugins'),
+                    ('google.com', '/recaptcha/'), ('youtube.com', '/['), ('example.com', '/private')),
+    blacklist_endswith=Generic.blacklist_endswith,
+    blacklist_filepath=('.txt', '/skip.mp4'),
+    ads_path_re=Generic._ads_path_re,
+    blacklist_path_same=(('player.vimeo.com', '/video/'), ('youtube.com', '/embed/')),
+)
+
+
+def compare_url_path(parsed_url, check_list, path_status='startswith'):
+    for netloc, path in check_list:
+        if path_status == '==':
+            if parsed_url.netloc.endswith(netloc) and parsed_url.path == path:
+                return True
+        elif parsed_url.netloc.endswith(netloc) and parsed_url.path.startswith(path):
+            return True
+    return False
+
+
+def legacy_reason(p, url_type, rules):
+    '''the if/elif chain of _make_url_list before URLFilter'''
+    if not p.scheme.startswith('http'):
+        return 'SCHEME'
+    elif url_type == 'iframe' and rules['whitelist_netloc'] and p.netloc.endswith(rules['whitelist_netloc']) is False:
+        return 'WL-netloc'
+    elif url_type == 'iframe' and rules['whitelist_path'] and compare_url_path(p, rules['whitelist_path']) is False:
+        return 'WL-path'
+    elif p.netloc.endswith(rules['blacklist_netloc_static']):
+        return 'BL-static'
+    elif rules['blacklist_netloc'] and p.netloc.endswith(rules['blacklist_netloc']):
+        return 'BL-netloc'
+    elif compare_url_path(p, rules['blacklist_path']):
+        return 'BL-path'
+    elif p.path.endswith(rules['blacklist_endswith']):
+        return 'BL-ew'
+    elif rules['blacklist_filepath'] and p.path.endswith(rules['blacklist_filepath']):
+        return 'BL-filepath'
+    elif rules['ads_path_re'].search(p.path) or p.netloc.startswith('ads.'):
+        return 'ADS'
+    elif compare_url_path(p, rules['blacklist_path_same'], path_status='=='):
+        return 'BL-path-same'
+    return None
+
+
+class TestTrie(unittest.TestCase):
+
+    def test_suffix_trie(self):
+        trie = SuffixTrie([('abv.bg', 1), ('.bg', 2), ('com', 3)])
+        self.assertIn('www.abv.bg', trie)
+        self.assertIn('xabv.bg', trie)
+        self.assertNotIn('abv.bgx', trie)
+        self.assertEqual(list(trie.values('www.abv.bg')), [2, 1])
+        self.assertFalse(SuffixTrie())
+        self.assertIn('anything', SuffixTrie([('', 1)]))
+
+    def test_prefix_trie(self):
+        trie = PrefixTrie(['/embed/', '/video'])
+        self.assertIn('/embed/123', trie)
+        self.assertIn('/videos', trie)
+        self.assertNotIn('/embe', trie)
+        self.assertNotIn('', trie)
+
+
+class TestURLFilter(unittest.TestCase):
+
+    urls = [
+        'http://example.com/video.m3u8',
+        'https://www.facebook.com/plugins/video.php',
+        'https://facebook.com/connect/x',
+        'https://www.google.com/recaptcha/api.js',
+        'https://www.youtube.com/embed/',
+        'https://www.youtube.com/embed/abc',
+        'https://player.vimeo.com/video/',
+        'https://www.youtube.com/[object',
+        'https://example.com/private/video.mp4',
+        'https://example.com/public/private.mp4',
+        'https://sub.blocked.com/a',
+        'https://notblocked.com/a',
+        'https://googletagmanager.com/gtm.js',
+        'https://abv.bg/',
+        'http://127.0.0.1/video',
+        'https://example.com/image.png',
+        'https://example.com/chat',
+        'https://example.com/notes.txt',
+        'https://example.com/skip.mp4',
+        'https://ads.example.com/video',
+        'https://example.com/ads/300x250_banner.html',
+        'https://example.com/ad.php',
+        'javascript:false',
+        'about:blank',
+        '//cdn.example.com/video.mp4',
+    ]
+
+    def check(self, rules, urls):
+        url_filter = URLFilter(**rules)
+        for url in urls:
+            parsed_url = urlparse(url)
+            for url_type in ('', 'iframe', 'playlist'):
+                self.assertEqual(url_filter.reason(parsed_url, url_type),
+                                 legacy_reason(parsed_url, url_type, rules), (url, url_type))
+
+    def test_reason(self):
+        self.check(rules, self.urls)
+
+    def test_reason_whitelist(self):
+        whitelist_rules = dict(rules, whitelist_netloc=('example.com', 'youtube.com'),
+                               whitelist_path=(('example.com', '/public'), ('youtube.com', '/embed/')))
+        self.check(whitelist_rules, self.urls)
+
+    def test_reason_random(self):
+        rand = random.Random(0)
+        netlocs = ['example.com', 'www.example.com', 'blocked.com', 'xblocked.com', 'ads.example.com',
+                   'youtube.com', 'm.youtube.com', 'player.vimeo.com', 'facebook.com', 'abv.bg']
+        paths = ['/', '/embed/', '/embed/x', '/video/', '/private', '/connect', '/a.png', '/b.txt',
+                 '/ads/1.html', '/chat', '/live.m3u8', '/[x']
+        urls = ['{0}://{1}{2}'.format(rand.choice(['http', 'https', 'ftp']), rand.choice(netlocs), rand.choice(paths))
+                for _ in range(500)]
+        self.check(dict(rules, whitelist_netloc=('example.com',), whitelist_path=(('youtube.com', '/embed'),)), urls)
+
+    def test_compile_url_filter(self):
+        self.assertIs(compile_url_filter(**rules), compile_url_filter(**rules))
+        self.assertIsNot(compile_url_filter(**rules), compile_url_filter(**dict(rules, blacklist_netloc=())))
@@ -0,0 +1,240 @@
+import os.path
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures.thread import _WorkItem
+from unittest.mock import Mock, patch
+
+import requests_mock
+
+from streamlink import Streamlink
+from streamlink.exceptions import NoPluginError, NoStreamsError
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+import plugins.generic  # noqa
+from plugins.generic import Generic, YTDLPool  # noqa
+
+
+class TestYTDLImport(unittest.TestCase):
+
+    def test_import_youtube_dl(self):
+        module = Mock()
+        with patch.object(plugins.generic, 'youtube_dl', None), \
+             patch('importlib.import_module', side_effect=[ImportError, module]) as import_module:
+            self.assertIs(plugins.generic.import_youtube_dl(), module)
+            self.assertIs(plugins.generic.import_youtube_dl(), module)
+        self.assertEqual([c[0][0] for c in import_module.call_args_list], ['yt_dlp', 'youtube_dl'])
+
+    def test_import_youtube_dl_missing(self):
+        with patch.object(plugins.generic, 'youtube_dl', None), \
+             patch('importlib.import_module', side_effect=ImportError):
+            self.assertIsNone(plugins.generic.import_youtube_dl())
+
+    def test_extract_info_missing(self):
+        # HAS_YTDL only finds the module spec, the import can still fail
+        plugin = Generic(Streamlink(), 'http://mocked/1', Options())
+        with patch.object(plugins.generic, 'youtube_dl', None), \
+             patch('importlib.import_module', side_effect=ImportError):
+            self.assertIsNone(plugin._ytdl_extract_info())
+
+
+class TestYTDLOrder(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+        self.release = threading.Event()
+        self.calls = []
+        patcher = patch.object(plugins.generic, 'HAS_YTDL', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.release.set()
+
+    def ytdl_fallback(self, streams, wait=False):
+        def _ytdl_fallback(plugin):
+            self.calls.append('ytdl')
+            if wait:
+                self.release.wait(5)
+            return streams
+        return patch.object(Generic, 'ytdl_fallback', autospec=True, side_effect=_ytdl_fallback)
+
+    def website_streams(self, streams, wait=False, release=False):
+        def _website_streams(plugin):
+            self.calls.append('website')
+            if wait:
+                self.release.wait(5)
+            if release:
+                self.release.set()
+            if isinstance(streams, Exception):
+                raise streams
+            return streams
+        return patch.object(Generic, '_get_website_streams', autospec=True, side_effect=_website_streams)
+
+    def get_streams(self, url='http://mocked/ytdl', **options):
+        plugin = Generic(self.session, url, Options(options))
+        return list(plugin._get_streams())
+
+    def test_ytdl_first(self):
+        with self.ytdl_fallback([('best', 'ytdl')]), self.website_streams(None):
+            self.assertEqual(self.get_streams(), [('best', 'ytdl')])
+        self.assertEqual(self.calls, ['ytdl'])
+
+    def test_ytdl_first_memoised(self):
+        # once for every URL of a resolve chain
+        with self.ytdl_fallback([]), self.website_streams(None):
+            plugin = Generic(self.session, 'http://mocked/ytdl', Options())
+            with plugin.context.activate():
+                self.assertEqual(plugin._ytdl_streams(), [])
+                iframe = Generic(self.session, 'http://mocked/ytdl', Options())
+                self.assertEqual(iframe._ytdl_streams(), [])
+        self.assertEqual(self.calls, ['ytdl'])
+
+    def test_ytdl_not_memoised_between_resolves(self):
+        with self.ytdl_fallback([]), self.website_streams(None):
+            with self.assertRaises(NoPluginError):
+                self.get_streams()
+            self.assertEqual(self.calls, ['ytdl', 'website'])
+            self.session = Streamlink()
+            with self.assertRaises(NoPluginError):
+                self.get_streams()
+        self.assertEqual(self.calls, ['ytdl', 'website', 'ytdl', 'website'])
+
+    def test_ytdl_last(self):
+        with self.ytdl_fallback([('best', 'ytdl')]), self.website_streams(iter([('best', 'website')])):
+            self.assertEqual(self.get_streams(**{'ytdl-order': 'last'}), [('best', 'website')])
+        self.assertEqual(self.calls, ['website'])
+
+        with self.ytdl_fallback([('best', 'ytdl')]), self.website_streams(None):
+            self.assertEqual(self.get_streams(**{'ytdl-order': 'last'}), [('best', 'ytdl')])
+        self.assertEqual(self.calls, ['website', 'website', 'ytdl'])
+
+    def test_ytdl_last_website_error(self):
+        # the page GET raises NoStreamsError, youtube-dl is still tried
+        for status in (403, 404):
+            self.calls = []
+            with requests_mock.Mocker() as mock, self.ytdl_fallback([('best', 'ytdl')]):
+                mock.get('http://mocked/ytdl', status_code=status)
+                self.assertEqual(self.get_streams(**{'ytdl-order': 'last'}), [('best', 'ytdl')])
+            self.assertEqual(self.calls, ['ytdl'])
+
+            self.session = Streamlink()
+            with requests_mock.Mocker() as mock, self.ytdl_fallback([]):
+                mock.get('http://mocked/ytdl', status_code=status)
+                with self.assertRaises(NoStreamsError):
+                    self.get_streams(**{'ytdl-order': 'last'})
+
+    def test_ytdl_race_website(self):
+        with self.ytdl_fallback([('best', 'ytdl')], wait=True), self.website_streams(iter([('best', 'website')])):
+            self.assertEqual(self.get_streams(**{'ytdl-order': 'race'}), [('best', 'website')])
+
+    def test_ytdl_race_empty_website(self):
+        for website in ({}, iter([])):
+            self.calls = []
+            self.release.clear()
+            with self.ytdl_fallback([('best', 'ytdl')], wait=True), self.website_streams(website, release=True):
+                self.assertEqual(self.get_streams(**{'ytdl-order': 'race'}), [('best', 'ytdl')])
+            self.assertEqual(self.calls, ['website', 'ytdl'] if self.calls[0] == 'website' else ['ytdl', 'website'])
+
+    def test_ytdl_race_empty(self):
+        with self.ytdl_fallback([], wait=True), self.website_streams(iter([]), release=True):
+            self.assertEqual(self.get_streams(**{'ytdl-order': 'race'}), [])
+        with self.ytdl_fallback([]), self.website_streams(None):
+            with self.assertRaises(NoPluginError):
+                self.get_streams(url='http://mocked/none', **{'ytdl-order': 'race'})
+
+    def test_ytdl_race_ytdl(self):
+        # the website is still resolved, youtube-dl does not wait for it
+        with self.ytdl_fallback([('best', 'ytdl')]), self.website_streams(None, wait=True):
+            start = time.monotonic()
+            self.assertEqual(self.get_streams(**{'ytdl-order': 'race'}), [('best', 'ytdl')])
+            self.assertLess(time.monotonic() - start, 2)
+        self.assertIn('ytdl', self.calls)
+
+    def test_ytdl_race_website_error(self):
+        error = NoStreamsError('http://mocked/ytdl')
+        with self.ytdl_fallback([('best', 'ytdl')], wait=True), self.website_streams(error, release=True):
+            self.assertEqual(self.get_streams(**{'ytdl-order': 'race'}), [('best', 'ytdl')])
+        with self.ytdl_fallback([]), self.website_streams(error):
+            with self.assertRaises(NoStreamsError):
+                self.get_streams(url='http://mocked/error', **{'ytdl-order': 'race'})
+
+    def test_ytdl_race_worker_started_late(self):
+        # the threads start after _ytdl_race has submitted both
+        run = _WorkItem.run
+
+        def delayed_run(item):
+            time.sleep(0.01)
+            return run(item)
+
+        with patch.object(_WorkItem, 'run', delayed_run), \
+             self.ytdl_fallback([('best', 'ytdl')]), self.website_streams(None):
+            start = time.monotonic()
+            self.assertEqual(self.get_streams(**{'ytdl-order': 'race', 'resolve-timeout': 3}), [('best', 'ytdl')])
+            self.assertLess(time.monotonic() - start, 2)
+
+
+class FakeYoutubeDL(object):
+    def __init__(self, params):
+        self.params = dict(params)
+        self.closed = False
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def extract_info(self, url, download=True):
+        return {'title': url, 'socket_timeout': self.params.get('socket_timeout')}
+
+
+class TestYTDLPool(unittest.TestCase):
+
+    def test_pool_checkout(self):
+        pool = YTDLPool(lambda: FakeYoutubeDL({}), size=1)
+        with pool.checkout() as ydl1:
+            with pool.checkout() as ydl2:
+                self.assertIsNot(ydl1, ydl2)
+        self.assertEqual(pool.created, 2)
+        # one idle instance is kept
+        self.assertFalse(ydl2.closed)
+        self.assertTrue(ydl1.closed)
+        with pool.checkout() as ydl3:
+            self.assertIs(ydl3, ydl2)
+        self.assertEqual(pool.created, 2)
+        pool.close()
+        self.assertTrue(ydl2.closed)
+
+    def test_pool_for_session(self):
+        session = Streamlink()
+        pool = YTDLPool.for_session(session, FakeYoutubeDL)
+        self.assertIs(YTDLPool.for_session(session, FakeYoutubeDL), pool)
+        self.assertIsNot(YTDLPool.for_session(Streamlink(), FakeYoutubeDL), pool)
+
+    def test_pool_extract_info(self):
+        module = Mock(__name__='yt_dlp', version=Mock(__version__='1'), YoutubeDL=Mock(side_effect=FakeYoutubeDL))
+        session = Streamlink()
+        with patch.object(plugins.generic, 'youtube_dl', module):
+            for url in ('http://mocked/1', 'http://mocked/2'):
+                plugin = Generic(session, url, Options())
+                self.assertEqual(plugin._ytdl_extract_info()['title'], url)
+        self.assertEqual(module.YoutubeDL.call_count, 1)
+
+    def test_pool_deadline(self):
+        # socket_timeout is only read by YoutubeDL.__init__, no pooled instance
+        instances = []
+
+        def youtube_dl(params):
+            instances.append(FakeYoutubeDL(params))
+            return instances[-1]
+
+        module = Mock(__name__='yt_dlp', version=Mock(__version__='1'), YoutubeDL=Mock(side_effect=youtube_dl))
+        session = Streamlink()
+        with patch.object(plugins.generic, 'youtube_dl', module):
+            for url in ('http://mocked/1', 'http://mocked/2'):
+                plugin = Generic(session, url, Options({'resolve-timeout': 60}))
+                info = plugin._ytdl_extract_info()
+                self.assertGreater(info['socket_timeout'], 0)
+                self.assertLessEqual(info['socket_timeout'], 60)
+        self.assertEqual(len(instances), 2)
+        self.assertTrue(all(ydl.closed for ydl in instances))
@@ -0,0 +1,111 @@
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+import plugins.generic  # noqa
+from plugins.generic import Generic, GenericCache, PersistentCache, ytdl_info_slim, ytdl_info_ttl  # noqa
+
+
+def ytdl_info(expire):
+    return {
+        'id': 'abc',
+        'title': 'Title',
+        'description': 'a long description',
+        'thumbnails': [{'url': 'http://mocked/thumb.jpg'}],
+        'formats': [
+            {
+                'format_id': '18',
+                'url': 'https://mocked.googlevideo.com/videoplayback?expire={0}&itag=18'.format(expire),
+                'protocol': 'https',
+                'ext': 'mp4',
+                'height': 360,
+                'vcodec': 'avc1',
+                'acodec': 'mp4a',
+                'filesize': 1000,
+                'fragments': [{'url': 'x'}],
+            },
+            {
+                'format_id': '96',
+                'url': 'https://mocked.googlevideo.com/hls/expire/{0}/itag/96/index.m3u8'.format(expire - 100),
+                'protocol': 'm3u8_native',
+                'height': 1080,
+                'vcodec': 'avc1',
+                'acodec': 'mp4a',
+            },
+        ],
+    }
+
+
+class TestYTDLInfo(unittest.TestCase):
+
+    def test_ytdl_info_slim(self):
+        slim = ytdl_info_slim(ytdl_info(2000000000))
+        self.assertEqual(sorted(slim), ['formats', 'title'])
+        self.assertEqual(sorted(slim['formats'][0]),
+                         ['acodec', 'ext', 'format_id', 'height', 'protocol', 'url', 'vcodec'])
+
+    def test_ytdl_info_ttl(self):
+        now = int(time.time())
+        self.assertTrue(1830 <= ytdl_info_ttl(ytdl_info(now + 2000), 3600) <= 1840)
+        self.assertIsNone(ytdl_info_ttl(ytdl_info(now + 100), 3600))
+        self.assertEqual(ytdl_info_ttl({'formats': [{'url': 'http://mocked/live.m3u8'}]}, 3600), 3600)
+        self.assertEqual(ytdl_info_ttl({}, 60), 60)
+        self.assertEqual(ytdl_info_ttl(ytdl_info(now + 7200), 600), 600)
+
+
+class TestYTDLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+        self.tmp = tempfile.mkdtemp()
+        GenericCache.ytdl_cache = PersistentCache(Path(self.tmp) / 'cache.sqlite', 'ytdl')
+
+    def tearDown(self):
+        del GenericCache.ytdl_cache
+        shutil.rmtree(self.tmp)
+
+    def ytdl_fallback(self, url='http://mocked/ytdl', **options):
+        plugin = Generic(self.session, url, Options(dict({'resolve-cache': True}, **options)))
+        return [name for name, stream in plugin.ytdl_fallback()]
+
+    def test_ytdl_cache(self):
+        info = ytdl_info(int(time.time()) + 7200)
+        with patch.object(Generic, '_ytdl_extract_info', return_value=info) as extract_info:
+            self.assertEqual(self.ytdl_fallback(), ['360p', '1080p'])
+            self.assertEqual(self.ytdl_fallback(), ['360p', '1080p'])
+            self.assertEqual(extract_info.call_count, 1)
+        self.assertEqual(GenericCache.ytdl_cache.get('http://mocked/ytdl')['value'], ytdl_info_slim(info))
+
+    def test_ytdl_cache_expired(self):
+        info = ytdl_info(int(time.time()) + 100)
+        with patch.object(Generic, '_ytdl_extract_info', return_value=info) as extract_info:
+            self.assertEqual(self.ytdl_fallback(), ['360p', '1080p'])
+            self.assertEqual(self.ytdl_fallback(), ['360p', '1080p'])
+            self.assertEqual(extract_info.call_count, 2)
+        self.assertIsNone(GenericCache.ytdl_cache.get('http://mocked/ytdl', stale=True))
+
+    def test_ytdl_cache_ttl_zero(self):
+        info = ytdl_info(int(time.time()) + 7200)
+        with patch.object(Generic, '_ytdl_extract_info', return_value=info) as extract_info:
+            self.assertEqual(self.ytdl_fallback(resolve_cache_ttl=0), ['360p', '1080p'])
+            self.assertEqual(self.ytdl_fallback(resolve_cache_ttl=0), ['360p', '1080p'])
+            self.assertEqual(extract_info.call_count, 2)
+        self.assertIsNone(GenericCache.ytdl_cache.get('http://mocked/ytdl', stale=True))
+
+    def test_ytdl_cache_website_headers(self):
+        # the Cache-Control of the website is not used for the youtube-dl info
+        info = ytdl_info(int(time.time()) + 7200)
+        plugin = Generic(self.session, 'http://mocked/ytdl', Options({'resolve-cache': True}))
+        plugin.res_headers = {'Cache-Control': 'no-store'}
+        with patch.object(Generic, '_ytdl_extract_info', return_value=info):
+            plugin.ytdl_fallback()
+        self.assertEqual(GenericCache.ytdl_cache.get('http://mocked/ytdl')['value'], ytdl_info_slim(info))
@@ -0,0 +1,128 @@
+import os.path
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+from streamlink import Streamlink
+from streamlink.stream import HLSStream, HTTPStream
+from streamlink.stream.ffmpegmux import MuxedStream
+
+sys.path.insert(0, os.path.abspath('..'))
+import plugins.generic  # noqa
+from plugins.generic import YTDLFormatIndex  # noqa
+
+
+def fmt(format_id, height=None, vcodec='none', acodec='none', protocol='https', ext='mp4', **kwargs):
+    return dict({'format_id': format_id, 'url': 'http://mocked/{0}'.format(format_id),
+                 'height': height, 'vcodec': vcodec, 'acodec': acodec, 'protocol': protocol, 'ext': ext},
+                **kwargs)
+
+
+info = {'formats': [
+    fmt('139', acodec='mp4a.40.5', ext='m4a', abr=48.7),
+    fmt('140', acodec='mp4a.40.2', ext='m4a', abr=129.5),
+    fmt('hls-audio', acodec='mp4a', protocol='m3u8_native', ext='aac', abr=256),
+    fmt('251', acodec='opus', ext='webm', abr=160),
+    fmt('160', 144, vcodec='avc1'),
+    fmt('244', 480, vcodec='vp9', ext='webm'),
+    fmt('18', 360, vcodec='avc1', acodec='mp4a'),
+    fmt('134', 360, vcodec='avc1'),
+    fmt('96', 1080, vcodec='avc1', acodec='mp4a', protocol='m3u8_native'),
+    fmt('137', 1080, vcodec='avc1'),
+    fmt('248', 1080, vcodec='vp9'),
+]}
+
+
+class TestYTDLFormatIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Streamlink()
+
+    def test_names(self):
+        index = YTDLFormatIndex(self.session, info)
+        self.assertEqual(index.names,
+                         ['audio_m4a', 'audio_m4a', 'audio_aac', 'audio_webm', '144p', '480p', '360p', '1080p'])
+        self.assertEqual([audio_fmt['format_id'] for name, kind, fmt, audio_fmt in index.entries if kind == 'video'],
+                         ['140', '251'])
+
+    def test_best_audio(self):
+        index = YTDLFormatIndex(self.session, info)
+        self.assertEqual(index.best_audio(fmt('137', 1080, vcodec='avc1'))['format_id'], '140')
+        self.assertEqual(index.best_audio(fmt('248', 1080, vcodec='vp9', ext='webm'))['format_id'], '251')
+        self.assertEqual(index.best_audio(fmt('hls-1080', 1080, vcodec='avc1', protocol='m3u8'))['format_id'],
+                         'hls-audio')
+        # unknown container, the highest bitrate of the same protocol
+        self.assertEqual(index.best_audio(fmt('flv', 1080, vcodec='flv1', ext='flv'))['format_id'], '251')
+
+    def test_best_audio_ids(self):
+        formats = [
+            fmt('dash-audio-low', acodec='mp4a', tbr=64),
+            fmt('dash-audio-high', acodec='mp4a', tbr=192),
+            fmt('dash-video-720', 720, vcodec='avc1', tbr=2500),
+        ]
+        index = YTDLFormatIndex(self.session, {'formats': formats})
+        self.assertEqual(index.names, ['audio_mp4', 'audio_mp4', '720p'])
+        self.assertEqual(index.entries[2][3]['format_id'], 'dash-audio-high')
+
+    def test_streams(self):
+        streams = list(YTDLFormatIndex(self.session, info))
+        self.assertEqual([type(stream) for name, stream in streams],
+                         [HTTPStream, HTTPStream, HLSStream, HTTPStream, MuxedStream, MuxedStream, HTTPStream, HLSStream])
+        self.assertEqual(streams[2][1].url, 'http://mocked/hls-audio')
+        self.assertEqual([substream.url for substream in streams[4][1].substreams],
+                         ['http://mocked/160', 'http://mocked/140'])
+
+    def test_video_without_audio(self):
+        index = YTDLFormatIndex(self.session, {'formats': [fmt('137', 1080, vcodec='avc1')]})
+        self.assertEqual(index.names, [])
+        self.assertFalse(index)
+
+    def test_lazy(self):
+        with patch.object(plugins.generic, 'HTTPStream') as http_stream:
+            index = YTDLFormatIndex(self.session, info)
+            self.assertEqual(len(index), 8)
+            self.assertEqual(http_stream.call_count, 0)
+            self.assertEqual(next(iter(index))[0], 'audio_m4a')
+            self.assertEqual(http_stream.call_count, 1)
+
+    def test_requested_formats(self):
+        requested = {'formats': [], 'requested_formats': [
+            {'manifest_url': 'http://mocked/master.m3u8'},
+            {'manifest_url': 'http://mocked/manifest.mpd'},
+            {'manifest_url': 'http://mocked/other'},
+        ]}
+        index = YTDLFormatIndex(self.session, requested)
+        self.assertEqual([kind for name, kind, fmt, audio_fmt in index.entries], ['hls', 'dash'])
+        self.assertEqual(index.names, [])
+
+    def test_requested_formats_parallel(self):
+        requested = {'requested_formats': [
+            {'format_id': 'video', 'manifest_url': 'http://mocked/master.m3u8'},
+            {'format_id': 'audio', 'manifest_url': 'http://mocked/master.m3u8'},
+            {'format_id': 'dash', 'manifest_url': 'http://mocked/manifest.mpd'},
+        ]}
+        started = threading.Event()
+
+        def manifest_streams(kind, manifest_url):
+            if kind == 'hls':
+                # the DASH manifest is fetched at the same time
+                self.assertTrue(started.wait(5))
+                return [('720p', 'hls')]
+            started.set()
+            return [('1080p', 'dash')]
+
+        index = YTDLFormatIndex(self.session, requested)
+        with patch.object(index, '_manifest_streams', side_effect=manifest_streams) as _manifest_streams:
+            self.assertEqual(list(index), [('720p', 'hls'), ('1080p', 'dash')])
+            self.assertEqual(len(index), 2)
+        self.assertEqual(_manifest_streams.call_count, 2)
+
+    def test_requested_formats_empty(self):
+        # the manifests have no streams, the website is resolved
+        requested = {'requested_formats': [{'manifest_url': 'http://mocked/unreachable.m3u8'}]}
+        index = YTDLFormatIndex(self.session, requested)
+        with patch.object(index, '_manifest_streams', return_value=[]) as _manifest_streams:
+            self.assertFalse(index)
+            self.assertEqual(list(index), [])
+        self.assertEqual(_manifest_streams.call_count, 1)
@@ -0,0 +1,117 @@
+import os
+import os.path
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest.mock import Mock, patch
+
+from streamlink import Streamlink
+from streamlink.options import Options
+
+sys.path.insert(0, os.path.abspath('..'))
+import plugins.generic  # noqa
+from plugins.generic import Generic, YTDLProcessPool  # noqa
+
+
+class FakeYoutubeDL(object):
+    instances = []
+
+    def __init__(self, params):
+        self.params = dict(params)
+        self.closed = False
+        self.instances.append(self)
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def extract_info(self, url, download=True):
+        if url.endswith('/hang'):
+            time.sleep(30)
+        if url.endswith('/slow'):
+            time.sleep(1)
+        if url.endswith('/error'):
+            raise ValueError('unsupported URL')
+        return {'title': str(os.getpid()), 'id': 'removed',
+                'formats': [{'url': url, 'protocol': 'https', 'filesize': 1}]}
+
+
+class TestYTDLProcessExtract(unittest.TestCase):
+
+    def test_socket_timeout(self):
+        # socket_timeout is only read by YoutubeDL.__init__
+        module = Mock(__name__='yt_dlp', version=Mock(__version__='1'), YoutubeDL=FakeYoutubeDL)
+        FakeYoutubeDL.instances = []
+        with patch.object(plugins.generic, 'youtube_dl', module), \
+                patch.object(plugins.generic, '_ytdl_process_ydl', None):
+            plugins.generic._ytdl_process_extract('http://mocked/1', {})
+            plugins.generic._ytdl_process_extract('http://mocked/2', {})
+            self.assertEqual(len(FakeYoutubeDL.instances), 1)
+            plugins.generic._ytdl_process_extract('http://mocked/3', {'socket_timeout': 5})
+            plugins.generic._ytdl_process_extract('http://mocked/4', {})
+        self.assertEqual([(ydl.params.get('socket_timeout'), ydl.closed) for ydl in FakeYoutubeDL.instances],
+                         [(None, False), (5, True)])
+
+
+@unittest.skipUnless(YTDLProcessPool.available(), 'fork is not available')
+class TestYTDLProcessPool(unittest.TestCase):
+
+    def setUp(self):
+        module = Mock(__name__='yt_dlp', version=Mock(__version__='1'), YoutubeDL=FakeYoutubeDL)
+        patcher = patch.object(plugins.generic, 'youtube_dl', module)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = Streamlink()
+
+    def tearDown(self):
+        YTDLProcessPool.kill()
+
+    def extract_info(self, url, **options):
+        plugin = Generic(self.session, url, Options(dict({'ytdl-process': True}, **options)))
+        return plugin._ytdl_extract_info()
+
+    def test_extract_info(self):
+        info = self.extract_info('http://mocked/video', **{'ytdl-pool-size': 1})
+        self.assertEqual(info['formats'], [{'url': 'http://mocked/video', 'protocol': 'https'}])
+        self.assertNotIn('id', info)
+        self.assertNotEqual(info['title'], str(os.getpid()))
+        # the worker is reused
+        self.assertEqual(self.extract_info('http://mocked/video')['title'], info['title'])
+
+    def test_extract_info_error(self):
+        self.assertIsNone(self.extract_info('http://mocked/error'))
+        self.assertIsNotNone(self.extract_info('http://mocked/video'))
+
+    def test_extract_info_timeout(self):
+        info = self.extract_info('http://mocked/video')
+        executor = YTDLProcessPool._executor
+        with self.assertRaises(FutureTimeoutError):
+            YTDLProcessPool.extract_info('http://mocked/hang', {}, timeout=0.5)
+        self.assertIsNot(YTDLProcessPool._executor, executor)
+        # a new worker
+        self.assertNotEqual(self.extract_info('http://mocked/video')['title'], info['title'])
+
+    def test_extract_info_option_timeout(self):
+        start = time.monotonic()
+        self.assertIsNone(self.extract_info('http://mocked/hang', **{'ytdl-timeout': 0.5}))
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_extract_info_default_timeout(self):
+        # a hung worker can't block the resolve without --generic-ytdl-timeout
+        with patch.object(YTDLProcessPool, 'extract_info', return_value=None) as extract_info:
+            self.extract_info('http://mocked/video')
+        self.assertEqual(extract_info.call_args[1]['timeout'], 60)
+
+    def test_extract_info_reset(self):
+        # the timeout of one extraction kills the workers of the others,
+        # they are started again in the new pool
+        self.extract_info('http://mocked/video')
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(YTDLProcessPool.extract_info('http://mocked/slow', {}, timeout=10)))
+        thread.start()
+        with self.assertRaises(FutureTimeoutError):
+            YTDLProcessPool.extract_info('http://mocked/hang', {}, timeout=0.5)
+        thread.join(15)
+        self.assertEqual(results[0]['formats'], [{'url': 'http://mocked/slow', 'protocol': 'https'}])